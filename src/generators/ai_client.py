@@ -1,15 +1,207 @@
 """AI client for generating documentation"""
 
 import asyncio
-from typing import Optional
-import openai
-import anthropic
+import contextlib
+import hashlib
+import json
+import random
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from utils.logger import setup_logger
 from utils.metrics import get_metrics
+from utils.rate_limiter import TokenBucket
+from .semantic_cache import SemanticCache
+
+# The provider SDKs (and httpx under them) are imported on first use so a run
+# that only talks to one provider doesn't pay the import time and memory of all
+if TYPE_CHECKING:
+    import httpx
 
 logger = setup_logger(__name__)
 
+T = TypeVar('T')
+
+# System prompt shared by every generation request
+SYSTEM_PROMPT = (
+    "You are an expert technical writer who creates clear, comprehensive documentation. "
+    "Always respond with well-structured markdown."
+)
+
+# httpx.Limits settings for the connection pool shared by every provider SDK
+# client. The SDK defaults keep too few idle connections around, so concurrent
+# generations keep re-doing TCP/TLS handshakes instead of reusing warm connections.
+# The aiohttp pool has no separate idle cap and uses the total and expiry only.
+HTTP_POOL_LIMITS = dict(
+    max_keepalive_connections=20,
+    max_connections=100,
+    keepalive_expiry=30
+)
+
+# Map OpenAI model names to Anthropic equivalents when the provider is switched
+ANTHROPIC_MODEL_ALIASES = {
+    "gpt-4o-mini": "claude-3-haiku-20240307",
+    "gpt-4": "claude-3-sonnet-20240229",
+}
+
+# Map OpenAI model names to OpenRouter model ids, which are prefixed with the vendor
+OPENROUTER_MODEL_ALIASES = {
+    "gpt-4o-mini": "openai/gpt-4o-mini",
+    "gpt-4": "openai/gpt-4",
+}
+
+# Model aliases by provider; other providers take model names as given
+MODEL_ALIASES = {
+    "anthropic": ANTHROPIC_MODEL_ALIASES,
+    "openrouter": OPENROUTER_MODEL_ALIASES,
+}
+
+# Terminal states of an OpenAI batch job
+OPENAI_BATCH_DONE = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Temperatures up to this are treated as deterministic for response caching
+CACHE_TEMPERATURE_EPSILON = 1e-6
+
+# Provider responses worth retrying after a backoff (the SDKs' own retry set)
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# Longest server-sent Retry-After honoured, in seconds
+MAX_RETRY_AFTER = 60.0
+
+# OpenRouter app attribution headers
+OPENROUTER_HEADERS = {
+    "HTTP-Referer": "https://github.com/mkadrlik/documentation-generator",
+    "X-Title": "Documentation Generator MCP Server"
+}
+
+def _chat_completions_call(
+    client,
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    cache_prefix: Optional[str] = None,
+    **extra
+):
+    """Start a request against an OpenAI-compatible chat completions API
+    
+    ``cache_prefix`` needs no markup here: these APIs cache a repeated prompt
+    prefix automatically, and the prefix already leads the user message.
+    """
+    return client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **extra
+    )
+
+def _openrouter_call(
+    client,
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    cache_prefix: Optional[str] = None,
+    **extra
+):
+    """Start an OpenRouter request
+    
+    OpenRouter supports many models, so the model name is used as provided
+    (e.g. anthropic/claude-3-haiku, openai/gpt-4o-mini, meta-llama/llama-3.1-8b-instruct),
+    except for the bare OpenAI names in OPENROUTER_MODEL_ALIASES.
+    """
+    return _chat_completions_call(
+        client, prompt, OPENROUTER_MODEL_ALIASES.get(model, model), max_tokens, temperature, cache_prefix,
+        extra_headers=OPENROUTER_HEADERS, **extra
+    )
+
+def _anthropic_user_content(prompt: str, cache_prefix: Optional[str]):
+    """User message content, with a cacheable prompt prefix split into its own cache_control block"""
+    if not cache_prefix or not prompt.startswith(cache_prefix):
+        return prompt
+    
+    blocks = [{"type": "text", "text": cache_prefix, "cache_control": {"type": "ephemeral"}}]
+    if len(prompt) > len(cache_prefix):
+        blocks.append({"type": "text", "text": prompt[len(cache_prefix):]})
+    return blocks
+
+def _anthropic_call(
+    client,
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    cache_prefix: Optional[str] = None,
+    **extra
+):
+    """Start a request against the Anthropic Messages API"""
+    return client.messages.create(
+        model=ANTHROPIC_MODEL_ALIASES.get(model, model),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        system=SYSTEM_PROMPT,
+        messages=[
+            {
+                "role": "user",
+                "content": _anthropic_user_content(prompt, cache_prefix)
+            }
+        ],
+        **extra
+    )
+
+def _provider_model(provider: str, model: str) -> str:
+    """Model id a provider knows a model by"""
+    return MODEL_ALIASES.get(provider, {}).get(model, model)
+
+def _chat_completions_result(response) -> Tuple[str, Optional[Dict[str, int]]]:
+    """Extract the text and token usage from a chat completions response"""
+    usage = response.usage
+    return response.choices[0].message.content, usage and {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens
+    }
+
+def _anthropic_result(response) -> Tuple[str, Optional[Dict[str, int]]]:
+    """Extract the text and token usage from an Anthropic Messages response"""
+    return response.content[0].text, {
+        "prompt_tokens": response.usage.input_tokens,
+        "completion_tokens": response.usage.output_tokens
+    }
+
+def _is_connection_error(error: Exception) -> bool:
+    """Whether an error is a dropped connection or timeout raised by a provider SDK"""
+    # APITimeoutError subclasses APIConnectionError in both SDKs. An SDK that
+    # hasn't been imported can't have raised anything, so neither is imported here
+    for name in ('openai', 'anthropic'):
+        error_type = getattr(sys.modules.get(name), 'APIConnectionError', None)
+        if error_type is not None and isinstance(error, error_type):
+            return True
+    return False
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a failed request, or None if it should not be retried"""
+    if getattr(error, 'status_code', None) not in RETRYABLE_STATUS_CODES and not _is_connection_error(error):
+        return None
+    
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        # Jittered exponential backoff so parallel callers don't retry in lockstep
+        return min(2 ** attempt, 30) * random.uniform(0.5, 1.5)
+
 class AIClient:
     """Client for AI providers"""
     
@@ -18,14 +210,84 @@ class AIClient:
         self._openai_client = None
         self._anthropic_client = None
         self._openrouter_client = None
+        self._http_client = None
+        self._aiohttp_client = None
         self.metrics = get_metrics(config)
+        
+        # LRU cache of deterministic (temperature 0) responses, keyed by request digest
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        
+        # Requests being generated, keyed by request digest, so identical
+        # concurrent requests share one provider call
+        self._inflight: Dict[str, "asyncio.Future[str]"] = {}
+        
+        # Optional cache of low-temperature responses matched by prompt embedding similarity
+        self._semantic_cache = None
+        if config.semantic_cache_enabled:
+            try:
+                self._semantic_cache = SemanticCache(config.semantic_cache_size, config.semantic_cache_threshold)
+            except ImportError:
+                logger.warning("numpy is not installed, semantic cache disabled")
+        
+        # Provider -> (client getter, request starter, response text/usage extractor)
+        self._adapters = {
+            'openai': (self._get_openai_client, _chat_completions_call, _chat_completions_result),
+            'anthropic': (self._get_anthropic_client, _anthropic_call, _anthropic_result),
+            'openrouter': (self._get_openrouter_client, _openrouter_call, _chat_completions_result),
+        }
+        
+        # Per-provider concurrency caps and request-rate buckets
+        self._semaphores = {
+            'openai': asyncio.Semaphore(config.openai_concurrency),
+            'anthropic': asyncio.Semaphore(config.anthropic_concurrency),
+            'openrouter': asyncio.Semaphore(config.openrouter_concurrency),
+        }
+        self._buckets = {
+            'openai': TokenBucket(rate=config.openai_rpm / 60, capacity=max(1.0, config.openai_rpm / 60)),
+            'anthropic': TokenBucket(rate=config.anthropic_rpm / 60, capacity=max(1.0, config.anthropic_rpm / 60)),
+            'openrouter': TokenBucket(rate=config.openrouter_rpm / 60, capacity=max(1.0, config.openrouter_rpm / 60)),
+        }
+    
+    def _get_http_client(self) -> "httpx.AsyncClient":
+        """Get the shared HTTP client used by all provider SDKs"""
+        if not self._http_client:
+            import httpx
+            self._http_client = httpx.AsyncClient(limits=httpx.Limits(**HTTP_POOL_LIMITS))
+        return self._http_client
+    
+    def _get_aiohttp_client(self) -> "httpx.AsyncClient":
+        """Get the shared aiohttp-backed client used by OpenAI-compatible SDKs"""
+        if not self._aiohttp_client:
+            import aiohttp
+            import httpx_aiohttp
+            import openai
+            
+            # httpx's own transport degrades under many in-flight requests;
+            # the SDK's aiohttp transport keeps latency flat at high concurrency.
+            # httpx ignores its limits when given a transport, so the pool is
+            # sized on the aiohttp connector (created on first request, inside the loop)
+            def session():
+                return aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_LIMITS['max_connections'],
+                    keepalive_timeout=HTTP_POOL_LIMITS['keepalive_expiry']
+                ))
+            
+            self._aiohttp_client = openai.DefaultAioHttpClient(
+                transport=httpx_aiohttp.AiohttpTransport(client=session)
+            )
+        return self._aiohttp_client
     
     def _get_openai_client(self):
         """Get OpenAI client"""
         if not self._openai_client:
             if not self.config.openai_api_key:
                 raise ValueError("OpenAI API key not configured")
-            self._openai_client = openai.AsyncOpenAI(api_key=self.config.openai_api_key)
+            import openai
+            self._openai_client = openai.AsyncOpenAI(
+                api_key=self.config.openai_api_key,
+                http_client=self._get_aiohttp_client(),
+                max_retries=0
+            )
         return self._openai_client
     
     def _get_anthropic_client(self):
@@ -33,7 +295,12 @@ class AIClient:
         if not self._anthropic_client:
             if not self.config.anthropic_api_key:
                 raise ValueError("Anthropic API key not configured")
-            self._anthropic_client = anthropic.AsyncAnthropic(api_key=self.config.anthropic_api_key)
+            import anthropic
+            self._anthropic_client = anthropic.AsyncAnthropic(
+                api_key=self.config.anthropic_api_key,
+                http_client=self._get_http_client(),
+                max_retries=0
+            )
         return self._anthropic_client
     
     def _get_openrouter_client(self):
@@ -41,139 +308,654 @@ class AIClient:
         if not self._openrouter_client:
             if not self.config.openrouter_api_key:
                 raise ValueError("OpenRouter API key not configured")
+            import openai
             self._openrouter_client = openai.AsyncOpenAI(
                 api_key=self.config.openrouter_api_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=self._get_aiohttp_client(),
+                max_retries=0
             )
         return self._openrouter_client
     
+    async def aclose(self):
+        """Close provider clients and the shared connection pools"""
+        for client in (self._openai_client, self._anthropic_client, self._openrouter_client):
+            if client:
+                await client.close()
+        for http_client in (self._http_client, self._aiohttp_client):
+            if http_client:
+                await http_client.aclose()
+        
+        self._openai_client = None
+        self._anthropic_client = None
+        self._openrouter_client = None
+        self._http_client = None
+        self._aiohttp_client = None
+    
+    @contextlib.asynccontextmanager
+    async def _rate_limited_slot(self, provider: str, request: Callable[[], Awaitable[T]]) -> AsyncIterator[T]:
+        """Run a provider request under its concurrency cap, rate limit and retry policy
+        
+        Yields the request's result and keeps holding the provider's concurrency
+        slot until the ``async with`` block exits, so a streamed response counts
+        against the cap until it has been read to the end.
+        """
+        attempt = 0
+        while True:
+            async with self._semaphores[provider]:
+                await self._buckets[provider].acquire()
+                try:
+                    result = await request()
+                except Exception as e:
+                    delay = _retry_delay(e, attempt)
+                    if delay is None or attempt >= self.config.ai_max_retries:
+                        raise
+                    error = e
+                else:
+                    yield result
+                    return
+            
+            # Back off outside the semaphore so other requests can use the slot
+            attempt += 1
+            logger.warning("%s request failed (%s), retrying in %.1fs (attempt %s)", provider, error, delay, attempt)
+            await asyncio.sleep(delay)
+    
+    async def _rate_limited(self, provider: str, request: Callable[[], Awaitable[T]]) -> T:
+        """Run a provider request under its concurrency cap, rate limit and retry policy"""
+        async with self._rate_limited_slot(provider, request) as result:
+            return result
+    
+    def _cache_key(self, provider: str, model: str, max_tokens: int, temperature: float, prompt: str) -> Optional[str]:
+        """Cache key for a request, or None if its response should not be cached"""
+        # Only (effectively) zero temperature is deterministic enough to reuse a
+        # previous response, so the temperature itself isn't part of the key
+        if temperature > CACHE_TEMPERATURE_EPSILON or self.config.ai_cache_size <= 0:
+            return None
+        return hashlib.blake2b(
+            f"{provider}|{model}|{max_tokens}|{prompt}".encode("utf-8")
+        ).hexdigest()
+    
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        """Look up a cached response, marking it as recently used"""
+        if key is None or key not in self._cache:
+            return None
+        self._cache.move_to_end(key)
+        return self._cache[key]
+    
+    def _cache_put(self, key: Optional[str], content: str):
+        """Store a response, evicting the least recently used ones over the size limit"""
+        if key is None:
+            return
+        self._cache[key] = content
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.config.ai_cache_size:
+            self._cache.popitem(last=False)
+    
+    def _inflight_key(
+        self, cache_key: Optional[str], provider: str, model: str, max_tokens: int, temperature: float, prompt: str
+    ) -> str:
+        """Key identifying identical requests in flight, reusing the cache key when there is one"""
+        if cache_key is not None:
+            return cache_key
+        return hashlib.blake2b(
+            f"{provider}|{model}|{max_tokens}|{temperature}|{prompt}".encode("utf-8")
+        ).hexdigest()
+    
+    async def _await_inflight(self, key: str) -> Optional[str]:
+        """Wait for the identical request in flight, if any, and return its response
+        
+        Returns None if there is no such request or it was abandoned, in which
+        case the caller should make the request itself. Errors are shared too.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            return None
+        try:
+            # Shielded so a waiter being cancelled doesn't cancel the shared result
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                return None
+            raise
+    
+    def _start_inflight(self, key: str) -> "asyncio.Future[str]":
+        """Register a request as in flight for identical ones to wait on"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+    
+    def _finish_inflight(
+        self, key: str, future: "asyncio.Future[str]", content: Optional[str] = None, error: Optional[BaseException] = None
+    ):
+        """Hand the outcome of an in-flight request to its waiters and unregister it"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if future.done():
+            return
+        if error is None:
+            future.set_result(content)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+            # Mark the error as retrieved; the request's own caller reports it
+            future.exception()
+        else:
+            # Cancelled or abandoned: waiters make the request themselves
+            future.cancel()
+    
+    async def embed(self, text: str) -> List[float]:
+        """Embed text with the configured OpenAI embedding model"""
+        client = self._get_openai_client()
+        response = await self._rate_limited(
+            'openai',
+            lambda: client.embeddings.create(model=self.config.embedding_model, input=text)
+        )
+        return response.data[0].embedding
+    
+    async def _semantic_lookup(
+        self, provider: str, model: str, max_tokens: int, temperature: float, semantic_key: Optional[Tuple[str, str]]
+    ) -> Tuple[Optional[List[float]], Optional[str]]:
+        """Embed the variable text of a request and find the cached response to a similar one
+        
+        Returns the embedding (None if the semantic cache doesn't apply) and the
+        cached response, if any.
+        """
+        if (
+            self._semantic_cache is None
+            or semantic_key is None
+            or temperature > self.config.semantic_cache_max_temperature
+        ):
+            return None, None
+        
+        scope, text = semantic_key
+        try:
+            embedding = await self.embed(text)
+        except Exception as e:
+            logger.warning("Failed to embed prompt, skipping semantic cache: %s", e)
+            return None, None
+        
+        return embedding, self._semantic_cache.lookup((provider, model, max_tokens), embedding, scope)
+    
+    async def _generate_similar(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        usage: Optional[Dict[str, int]],
+        cache_prefix: Optional[str],
+        semantic_key: Optional[Tuple[str, str]]
+    ) -> str:
+        """Generate text, reusing the response to a similar earlier request if there is one"""
+        embedding, cached = await self._semantic_lookup(provider, model, max_tokens, temperature, semantic_key)
+        if cached is not None:
+            logger.debug("Serving %s response from semantic cache", provider)
+            return cached
+        
+        content = await self._generate(provider, prompt, model, max_tokens, temperature, usage, cache_prefix)
+        if embedding is not None:
+            self._semantic_cache.add((provider, model, max_tokens), embedding, content, semantic_key[0])
+        return content
+    
     async def generate_text(
         self,
         prompt: str,
         provider: str = None,
         model: str = None,
         max_tokens: int = None,
-        temperature: float = None
+        temperature: float = None,
+        usage: Optional[Dict[str, int]] = None,
+        cache_prefix: Optional[str] = None,
+        semantic_key: Optional[Tuple[str, str]] = None
     ) -> str:
-        """Generate text using specified AI provider"""
+        """Generate text using specified AI provider
+        
+        If a ``usage`` dict is passed it is filled with the provider-reported
+        ``prompt_tokens`` and ``completion_tokens`` of the request. Responses to
+        temperature 0 requests are cached and reused without calling the provider.
+        Identical requests made while one is in flight share its response.
+        ``cache_prefix`` is a leading part of ``prompt`` that stays the same
+        across calls; providers that need explicit markup get it flagged for
+        prompt caching.
+        
+        ``semantic_key`` opts a low-temperature request into the semantic cache
+        as ``(scope, text)``: ``text`` is the variable part of the prompt that
+        gets embedded, and ``scope`` everything else about the prompt (e.g. the
+        template and title it was rendered with). A response is only reused for
+        a request with the same scope and similar text.
+        """
+        
+        # Use config defaults if not provided
+        provider = provider.lower() if provider else self.config.default_ai_provider
+        model = model or self.config.default_model
+        max_tokens = max_tokens if max_tokens is not None else self.config.default_max_tokens
+        temperature = temperature if temperature is not None else self.config.default_temperature
+        
+        cache_key = self._cache_key(provider, model, max_tokens, temperature, prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Serving %s response from cache", provider)
+            return cached
+        
+        # Identical requests already in flight wait for the first one and share
+        # its response instead of calling the provider again
+        key = self._inflight_key(cache_key, provider, model, max_tokens, temperature, prompt)
+        shared = await self._await_inflight(key)
+        if shared is not None:
+            logger.debug("Sharing in-flight %s response", provider)
+            return shared
+        
+        future = self._start_inflight(key)
+        try:
+            content = await self._generate_similar(
+                provider, prompt, model, max_tokens, temperature, usage, cache_prefix, semantic_key
+            )
+        except BaseException as e:
+            self._finish_inflight(key, future, error=e)
+            raise
+        
+        self._cache_put(cache_key, content)
+        self._finish_inflight(key, future, content)
+        return content
+    
+    async def generate_text_race(
+        self,
+        prompt: str,
+        providers: Optional[List[str]] = None,
+        model: str = None,
+        max_tokens: int = None,
+        temperature: float = None,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Tuple[str, str, str]:
+        """Send a prompt to several providers at once and return the first successful response
+        
+        Returns ``(provider, model, text)`` of the winning response, where
+        ``model`` is the id the provider was asked for (e.g. the Anthropic
+        equivalent of an OpenAI model name). If a ``usage`` dict is passed it is
+        filled with the winner's token usage.
+        
+        Racing multiplies token spend, so unless AI_RACE_ENABLED is set only the
+        first provider is asked (the default provider if none are configured).
+        The error of the last failing provider is raised if none of them succeed.
+        """
+        providers = providers or self.config.ai_race_providers or (self.config.default_ai_provider,)
+        if not self.config.ai_race_enabled:
+            providers = providers[:1]
+        model = model or self.config.default_model
+        
+        # Each racer asks for its provider's own model id and gets its own usage dict
+        racers = [(provider.lower(), _provider_model(provider.lower(), model), {}) for provider in providers]
+        if len(racers) == 1:
+            provider, provider_model, _ = racers[0]
+            text = await self.generate_text(prompt, provider, provider_model, max_tokens, temperature, usage)
+            return provider, provider_model, text
+        
+        tasks = {
+            asyncio.create_task(
+                self.generate_text(prompt, provider, provider_model, max_tokens, temperature, racer_usage)
+            ): (provider, provider_model, racer_usage)
+            for provider, provider_model, racer_usage in racers
+        }
+        errors = []
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # A cancelled racer didn't fail; the others may still win
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        provider, provider_model, racer_usage = tasks[task]
+                        if usage is not None:
+                            usage.update(racer_usage)
+                        return provider, provider_model, task.result()
+                    errors.append(task.exception())
+            if not errors:
+                raise RuntimeError("Every provider in the race was cancelled")
+            raise errors[-1]
+        finally:
+            # Stop the slower providers; their results would be thrown away
+            for task in tasks:
+                task.cancel()
+    
+    async def stream_text(
+        self,
+        prompt: str,
+        provider: str = None,
+        model: str = None,
+        max_tokens: int = None,
+        temperature: float = None,
+        usage: Optional[Dict[str, int]] = None,
+        cache_prefix: Optional[str] = None,
+        semantic_key: Optional[Tuple[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """Stream generated text from the specified AI provider as it arrives
+        
+        If a ``usage`` dict is passed it is filled with the provider-reported
+        ``prompt_tokens`` and ``completion_tokens`` once the stream ends. Cached
+        temperature 0 responses, and responses shared with an identical request
+        already in flight, are yielded in one piece. ``cache_prefix`` and
+        ``semantic_key`` are handled as in ``generate_text``.
+        """
         
         # Use config defaults if not provided
-        provider = provider or self.config.default_ai_provider
+        provider = provider.lower() if provider else self.config.default_ai_provider
         model = model or self.config.default_model
-        max_tokens = max_tokens or self.config.default_max_tokens
-        temperature = temperature or self.config.default_temperature
-        
-        if provider.lower() == "openai":
-            return await self._generate_openai(prompt, model, max_tokens, temperature)
-        elif provider.lower() == "anthropic":
-            return await self._generate_anthropic(prompt, model, max_tokens, temperature)
-        elif provider.lower() == "openrouter":
-            return await self._generate_openrouter(prompt, model, max_tokens, temperature)
+        max_tokens = max_tokens if max_tokens is not None else self.config.default_max_tokens
+        temperature = temperature if temperature is not None else self.config.default_temperature
+        
+        cache_key = self._cache_key(provider, model, max_tokens, temperature, prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Serving %s response from cache", provider)
+            if cached:
+                yield cached
+            return
+        
+        # Identical requests already in flight get the first one's response in one piece
+        key = self._inflight_key(cache_key, provider, model, max_tokens, temperature, prompt)
+        shared = await self._await_inflight(key)
+        if shared is not None:
+            logger.debug("Sharing in-flight %s response", provider)
+            if shared:
+                yield shared
+            return
+        
+        future = self._start_inflight(key)
+        parts = []
+        try:
+            async for chunk in self._stream_uncached(
+                provider, prompt, model, max_tokens, temperature, usage, cache_prefix, semantic_key
+            ):
+                parts.append(chunk)
+                yield chunk
+        except BaseException as e:
+            self._finish_inflight(key, future, error=e)
+            raise
+        
+        content = "".join(parts)
+        self._cache_put(cache_key, content)
+        self._finish_inflight(key, future, content)
+    
+    async def _stream_uncached(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        usage: Optional[Dict[str, int]],
+        cache_prefix: Optional[str],
+        semantic_key: Optional[Tuple[str, str]]
+    ) -> AsyncIterator[str]:
+        """Stream a response from the semantic cache or the provider"""
+        embedding, cached = await self._semantic_lookup(provider, model, max_tokens, temperature, semantic_key)
+        if cached is not None:
+            logger.debug("Serving %s response from semantic cache", provider)
+            if cached:
+                yield cached
+            return
+        
+        if provider == "anthropic":
+            stream = self._stream_anthropic(prompt, model, max_tokens, temperature, usage, cache_prefix)
+        elif provider in self._adapters:
+            stream = self._stream_chat_completions(provider, prompt, model, max_tokens, temperature, usage, cache_prefix)
         else:
             raise ValueError(f"Unsupported AI provider: {provider}")
+        
+        # Match the whitespace stripping of the non-streaming path: drop leading
+        # whitespace and hold back trailing whitespace until more text follows
+        started = False
+        pending = ""
+        parts = []
+        async for chunk in stream:
+            if not started:
+                chunk = chunk.lstrip()
+                if not chunk:
+                    continue
+                started = True
+            text = pending + chunk
+            stripped = text.rstrip()
+            pending = text[len(stripped):]
+            if stripped:
+                if embedding is not None:
+                    parts.append(stripped)
+                yield stripped
+        
+        if embedding is not None:
+            self._semantic_cache.add((provider, model, max_tokens), embedding, "".join(parts), semantic_key[0])
     
-    async def _generate_openai(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
-        """Generate text using OpenAI"""
+    async def _stream_chat_completions(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        usage: Optional[Dict[str, int]] = None,
+        cache_prefix: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream text from an OpenAI-compatible chat completions API"""
+        get_client, call, _ = self._adapters[provider]
         try:
-            client = self._get_openai_client()
+            client = get_client()
             
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert technical writer who creates clear, comprehensive documentation. Always respond with well-structured markdown."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            # Token counts arrive in an extra final chunk, so only ask for them when wanted
+            extra = {"stream_options": {"include_usage": True}} if usage is not None else {}
             
-            content = response.choices[0].message.content.strip()
-            self.metrics.record_ai_request(provider="openai", model=model, success=True)
-            return content
+            # The concurrency slot is held until the whole stream has been read
+            async with self._rate_limited_slot(provider, lambda: call(
+                client, prompt, model, max_tokens, temperature, cache_prefix, stream=True, **extra
+            )) as stream:
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+                    if usage is not None and event.usage:
+                        usage["prompt_tokens"] = event.usage.prompt_tokens
+                        usage["completion_tokens"] = event.usage.completion_tokens
+            
+            self.metrics.record_ai_request(ai_provider=provider, model=model, success=True)
             
         except Exception as e:
-            self.metrics.record_ai_request(provider="openai", model=model, success=False)
-            logger.error(f"OpenAI generation error: {e}")
+            self.metrics.record_ai_request(ai_provider=provider, model=model, success=False)
+            logger.error("%s streaming error: %s", provider, e)
             raise
     
-    async def _generate_anthropic(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
-        """Generate text using Anthropic"""
+    async def _stream_anthropic(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        usage: Optional[Dict[str, int]] = None,
+        cache_prefix: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream text from Anthropic"""
         try:
             client = self._get_anthropic_client()
             
-            # Map model names if needed
-            if model == "gpt-4o-mini":
-                model = "claude-3-haiku-20240307"
-            elif model == "gpt-4":
-                model = "claude-3-sonnet-20240229"
-            
-            response = await client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system="You are an expert technical writer who creates clear, comprehensive documentation. Always respond with well-structured markdown.",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
+            # The concurrency slot is held until the whole stream has been read
+            async with self._rate_limited_slot("anthropic", lambda: _anthropic_call(
+                client, prompt, model, max_tokens, temperature, cache_prefix, stream=True
+            )) as stream:
+                async for event in stream:
+                    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield event.delta.text
+                    elif usage is not None:
+                        # Input tokens come with message_start, the running output count with message_delta
+                        if event.type == "message_start":
+                            usage["prompt_tokens"] = event.message.usage.input_tokens
+                        elif event.type == "message_delta":
+                            usage["completion_tokens"] = event.usage.output_tokens
+            
+            self.metrics.record_ai_request(ai_provider="anthropic", model=model, success=True)
+            
+        except Exception as e:
+            self.metrics.record_ai_request(ai_provider="anthropic", model=model, success=False)
+            logger.error("Anthropic streaming error: %s", e)
+            raise
+    
+    async def generate_batch(
+        self,
+        prompts: Dict[str, str],
+        provider: str = None,
+        model: str = None,
+        max_tokens: int = None,
+        temperature: float = None
+    ) -> Dict[str, str]:
+        """Generate text for many prompts through the provider's Batch API
+        
+        Takes a mapping of custom ID to prompt and returns a mapping of custom ID to
+        generated text. Prompts whose request failed are missing from the result.
+        """
+        provider = provider.lower() if provider else self.config.default_ai_provider
+        model = model or self.config.default_model
+        max_tokens = max_tokens if max_tokens is not None else self.config.default_max_tokens
+        temperature = temperature if temperature is not None else self.config.default_temperature
+        
+        if provider == "openai":
+            return await self._batch_openai(prompts, model, max_tokens, temperature)
+        elif provider == "anthropic":
+            return await self._batch_anthropic(prompts, model, max_tokens, temperature)
+        else:
+            raise ValueError(f"Batch generation not supported for AI provider: {provider}")
+    
+    async def _batch_openai(self, prompts: Dict[str, str], model: str, max_tokens: int, temperature: float) -> Dict[str, str]:
+        """Run prompts through the OpenAI Batch API"""
+        try:
+            client = self._get_openai_client()
+            
+            lines = [
+                json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": [
+                            {
+                                "role": "system",
+                                "content": SYSTEM_PROMPT
+                            },
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        "max_tokens": max_tokens,
+                        "temperature": temperature
                     }
-                ]
+                })
+                for custom_id, prompt in prompts.items()
+            ]
+            
+            batch_file = await client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
             )
+            batch = await client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info("Submitted OpenAI batch %s with %s requests", batch.id, len(prompts))
+            
+            while batch.status not in OPENAI_BATCH_DONE:
+                await asyncio.sleep(self.config.batch_poll_interval)
+                batch = await client.batches.retrieve(batch.id)
+            
+            if not batch.output_file_id:
+                raise RuntimeError(f"OpenAI batch {batch.id} finished with status {batch.status} and no output")
             
-            content = response.content[0].text.strip()
-            self.metrics.record_ai_request(provider="anthropic", model=model, success=True)
-            return content
+            output = await client.files.content(batch.output_file_id)
+            results = {}
+            for line in output.text.splitlines():
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"].strip()
+            
+            self.metrics.record_ai_request(ai_provider="openai", model=model, success=True)
+            return results
             
         except Exception as e:
-            self.metrics.record_ai_request(provider="anthropic", model=model, success=False)
-            logger.error(f"Anthropic generation error: {e}")
+            self.metrics.record_ai_request(ai_provider="openai", model=model, success=False)
+            logger.error("OpenAI batch error: %s", e)
             raise
     
-    async def _generate_openrouter(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
-        """Generate text using OpenRouter"""
+    async def _batch_anthropic(self, prompts: Dict[str, str], model: str, max_tokens: int, temperature: float) -> Dict[str, str]:
+        """Run prompts through the Anthropic Message Batches API"""
+        model = ANTHROPIC_MODEL_ALIASES.get(model, model)
         try:
-            client = self._get_openrouter_client()
-            
-            # OpenRouter supports many models - use the model name as provided
-            # Popular OpenRouter models:
-            # - anthropic/claude-3-sonnet
-            # - anthropic/claude-3-haiku
-            # - openai/gpt-4o-mini
-            # - openai/gpt-4o
-            # - meta-llama/llama-3.1-8b-instruct
-            # - google/gemini-pro
-            
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert technical writer who creates clear, comprehensive documentation. Always respond with well-structured markdown."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
+            client = self._get_anthropic_client()
+            
+            batch = await client.messages.batches.create(requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": {
+                        "model": model,
+                        "max_tokens": max_tokens,
+                        "temperature": temperature,
+                        "system": SYSTEM_PROMPT,
+                        "messages": [
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ]
                     }
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/mkadrlik/documentation-generator",
-                    "X-Title": "Documentation Generator MCP Server"
                 }
+                for custom_id, prompt in prompts.items()
+            ])
+            logger.info("Submitted Anthropic batch %s with %s requests", batch.id, len(prompts))
+            
+            while batch.processing_status != "ended":
+                await asyncio.sleep(self.config.batch_poll_interval)
+                batch = await client.messages.batches.retrieve(batch.id)
+            
+            results = {}
+            async for entry in await client.messages.batches.results(batch.id):
+                if entry.result.type == "succeeded":
+                    results[entry.custom_id] = entry.result.message.content[0].text.strip()
+            
+            self.metrics.record_ai_request(ai_provider="anthropic", model=model, success=True)
+            return results
+            
+        except Exception as e:
+            self.metrics.record_ai_request(ai_provider="anthropic", model=model, success=False)
+            logger.error("Anthropic batch error: %s", e)
+            raise
+    
+    async def _generate(
+        self,
+        provider: str,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        usage: Optional[Dict[str, int]] = None,
+        cache_prefix: Optional[str] = None
+    ) -> str:
+        """Generate text through the adapter registered for a provider"""
+        try:
+            get_client, call, extract = self._adapters[provider]
+        except KeyError:
+            raise ValueError(f"Unsupported AI provider: {provider}") from None
+        
+        try:
+            client = get_client()
+            response = await self._rate_limited(
+                provider, lambda: call(client, prompt, model, max_tokens, temperature, cache_prefix)
             )
             
-            content = response.choices[0].message.content.strip()
-            self.metrics.record_ai_request(provider="openrouter", model=model, success=True)
-            return content
+            content, response_usage = extract(response)
+            if usage is not None and response_usage:
+                usage.update(response_usage)
+            self.metrics.record_ai_request(ai_provider=provider, model=model, success=True)
+            return content.strip()
             
         except Exception as e:
-            self.metrics.record_ai_request(provider="openrouter", model=model, success=False)
-            logger.error(f"OpenRouter generation error: {e}")
-            raise
\ No newline at end of file
+            self.metrics.record_ai_request(ai_provider=provider, model=model, success=False)
+            logger.error("%s generation error: %s", provider, e)
+            raise
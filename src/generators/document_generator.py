@@ -1,11 +1,18 @@
 """Document generator with AI integration"""
 
-import json
+import asyncio
+import mmap
+import os
+import re
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, List, Mapping, Optional
 from pathlib import Path
 
+import orjson
+
 from .ai_client import AIClient
 from .templates import DocumentTemplates
 from utils.logger import setup_logger
@@ -13,6 +20,41 @@ from utils.metrics import get_metrics, DocumentGenerationTimer
 
 logger = setup_logger(__name__)
 
+# Seconds to wait for more metadata records before writing them out together
+METADATA_FLUSH_DELAY = 0.25
+
+# Streamed characters to collect before handing a write to a worker thread
+WRITE_BATCH_CHARS = 64 * 1024
+
+# Runs of characters that are unsafe in output filenames (path separators, whitespace, ...)
+_SAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+# Longest title fragment kept in an output filename
+MAX_FILENAME_TITLE = 80
+
+@lru_cache(maxsize=64)
+def _filename_prefix(doc_type: str) -> str:
+    """Sanitized doc type part of an output filename, computed once per type"""
+    return _SAFE_FILENAME.sub('_', doc_type)
+
+def _read_text(path: Path) -> str:
+    """Read a UTF-8 file, decoding straight from a memory map of it"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return str(view, 'utf-8')
+
+async def _once(text: str) -> AsyncIterator[str]:
+    """Yield a complete response as a single chunk"""
+    yield text
+
+def _write_and_close(f, data: str):
+    """Write the final chunk of a document and close the file"""
+    with f:
+        f.write(data)
+
 class DocumentGenerator:
     """Main document generator class"""
     
@@ -21,38 +63,133 @@ class DocumentGenerator:
         self.ai_client = AIClient(config)
 
         # Pass configured templates directory to avoid hard-coded /app path during tests
-        self.templates = DocumentTemplates(templates_dir=self.config.templates_dir)
+        self.templates = DocumentTemplates.get(self.config.templates_dir)
         self.output_dir = Path(self.config.output_dir)
-        self.metadata_file = self.output_dir / "documents_metadata.json"
+        # Append-only log: one JSON record per line, later records win
+        self.metadata_file = self.output_dir / "documents_metadata.jsonl"
+        self.legacy_metadata_file = self.output_dir / "documents_metadata.json"
         self.metrics = get_metrics(self.config)
 
+        # Metadata records waiting for the debounced flush
+        self._meta_lock = asyncio.Lock()
+        self._meta_pending: List[str] = []
+        self._meta_flusher_task: Optional[asyncio.Task] = None
+
         # Load existing metadata
         self._load_metadata()
+        self._filename_to_id = {m['filename']: doc_id for doc_id, m in self.metadata.items()}
+        
+        # Document IDs per type, oldest first (metadata is kept in creation order)
+        self._by_type: Dict[str, List[str]] = {}
+        for doc_id, m in self.metadata.items():
+            self._by_type.setdefault(m['doc_type'], []).append(doc_id)
 
         # Update template count metric
         self.metrics.update_template_count(len(self.templates.get_all_types()))
     
     def _load_metadata(self):
         """Load document metadata"""
+        self.metadata = {}
         if self.metadata_file.exists():
+            stale_lines = 0
             try:
-                with open(self.metadata_file, 'r') as f:
-                    self.metadata = json.load(f)
+                with open(self.metadata_file, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = orjson.loads(line)
+                        except ValueError:
+                            # Torn write from an interrupted append
+                            stale_lines += 1
+                            continue
+                        if entry['id'] in self.metadata:
+                            stale_lines += 1
+                        self.metadata[entry['id']] = entry
             except Exception as e:
-                logger.warning(f"Could not load metadata: {e}")
+                logger.warning("Could not load metadata: %s", e)
                 self.metadata = {}
-        else:
-            self.metadata = {}
+                return
+            
+            if stale_lines:
+                self._compact_metadata()
+        elif self.legacy_metadata_file.exists():
+            # Migrate metadata written by older versions as a single JSON object
+            try:
+                with open(self.legacy_metadata_file, 'rb') as f:
+                    legacy = orjson.loads(f.read())
+                self.metadata = dict(sorted(legacy.items(), key=lambda item: item[1]['created_at']))
+                self._compact_metadata()
+                logger.info("Migrated %s metadata entries to %s", len(self.metadata), self.metadata_file.name)
+            except Exception as e:
+                logger.warning("Could not migrate legacy metadata: %s", e)
+                self.metadata = {}
+    
+    def _queue_metadata(self, doc_id: str):
+        """Queue a document's metadata record for the next debounced flush"""
+        self._meta_pending.append(doc_id)
+        if self._meta_flusher_task is None or self._meta_flusher_task.done():
+            self._meta_flusher_task = asyncio.get_running_loop().create_task(self._flush_metadata_later())
+    
+    async def _flush_metadata_later(self):
+        """Write queued metadata records after a short coalescing delay"""
+        try:
+            await asyncio.sleep(METADATA_FLUSH_DELAY)
+            async with self._meta_lock:
+                self._write_pending_metadata()
+        finally:
+            # Runs on cancellation too, so queued records survive loop shutdown
+            self._write_pending_metadata()
+    
+    async def flush_metadata(self):
+        """Write any queued metadata records immediately"""
+        task = self._meta_flusher_task
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        async with self._meta_lock:
+            self._write_pending_metadata()
     
-    def _save_metadata(self):
-        """Save document metadata"""
+    def _write_pending_metadata(self):
+        """Append all queued metadata records in a single write"""
+        if not self._meta_pending:
+            return
+        pending, self._meta_pending = self._meta_pending, []
         try:
-            with open(self.metadata_file, 'w') as f:
-                json.dump(self.metadata, f, indent=2, default=str)
+            with open(self.metadata_file, 'ab') as f:
+                f.write(b"".join(
+                    orjson.dumps(self.metadata[doc_id], option=orjson.OPT_APPEND_NEWLINE)
+                    for doc_id in pending
+                ))
         except Exception as e:
-            logger.error(f"Could not save metadata: {e}")
+            logger.error("Could not save metadata: %s", e)
     
-    def get_available_types(self) -> Dict[str, Dict[str, str]]:
+    def _compact_metadata(self):
+        """Rewrite the metadata log with one record per document"""
+        # Write to a temp file and swap it in so an interrupted rewrite never
+        # leaves a truncated log behind
+        tmp_file = self.metadata_file.with_suffix(".jsonl.tmp")
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(b"".join(
+                    orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+                    for entry in self.metadata.values()
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.metadata_file)
+        except Exception as e:
+            logger.error("Could not compact metadata: %s", e)
+    
+    async def aclose(self):
+        """Flush pending metadata and release network resources held by the AI client"""
+        await self.flush_metadata()
+        await self.ai_client.aclose()
+    
+    def get_available_types(self) -> Mapping[str, Dict[str, str]]:
         """Get all available document types"""
         return self.templates.get_all_types()
     
@@ -80,42 +217,276 @@ class DocumentGenerator:
         temperature: Optional[float] = None
     ) -> Dict[str, Any]:
         """Generate documentation from content"""
+        result = {}
+        parts = [
+            chunk async for chunk in self.generate_document_stream(
+                content=content,
+                doc_type=doc_type,
+                title=title,
+                context=context,
+                ai_provider=ai_provider,
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                result=result
+            )
+        ]
+        result['markdown'] = "".join(parts)
+        return result
+    
+    async def generate_document_stream(
+        self,
+        content: str,
+        doc_type: str,
+        title: str,
+        context: str = "",
+        ai_provider: Optional[str] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Generate documentation from content, yielding markdown chunks as they arrive
         
-        # Get template
-        template = self.templates.get_template(doc_type)
-        if not template:
-            raise ValueError(f"Unknown document type: {doc_type}")
+        Chunks are written to the output file as they are received. When the
+        stream completes, ``result`` (if given) is filled with the document
+        id, filename and metadata.
+        """
         
         # Prepare prompt
-        prompt = self._build_prompt(template, content, title, context)
+        prompt = self._build_prompt(doc_type, content, title, context)
+        
+        # The semantic cache embeds only the source content; the rest of the
+        # prompt (template, title, context) has to match exactly
+        semantic_key = None
+        if self.config.semantic_cache_enabled:
+            semantic_key = (self._build_prompt(doc_type, "", title, context), content)
         
         # Generate with AI using metrics timer
-        logger.info(f"Generating {doc_type} document: {title}")
+        logger.info("Generating %s document: %s", doc_type, title)
+        
+        doc_id = str(uuid.uuid4())
+        filename = self._document_filename(doc_id, doc_type, title)
+        filepath = self.output_dir / filename
+        usage = {}
         
         with DocumentGenerationTimer(doc_type, ai_provider or self.config.default_ai_provider, 
                                     model or self.config.default_model, self.metrics) as timer:
-            markdown_content = await self.ai_client.generate_text(
-                prompt=prompt,
-                provider=ai_provider or self.config.default_ai_provider,
+            # File I/O runs in worker threads so large documents don't stall the
+            # event loop; chunks are batched to keep thread hand-offs rare
+            f = await asyncio.to_thread(open, filepath, 'w', encoding='utf-8')
+            try:
+                pending = []
+                pending_chars = 0
+                # Without an explicit provider, racing (if enabled) takes the first full
+                # answer; the winning provider and its model are what gets recorded
+                if self.config.ai_race_enabled and not ai_provider:
+                    ai_provider, model, text = await self.ai_client.generate_text_race(
+                        prompt,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        usage=usage
+                    )
+                    timer.ai_provider = ai_provider
+                    timer.model = model
+                    chunks = _once(text)
+                else:
+                    chunks = self.ai_client.stream_text(
+                        prompt=prompt,
+                        provider=ai_provider or self.config.default_ai_provider,
+                        model=model or self.config.default_model,
+                        max_tokens=max_tokens if max_tokens is not None else self.config.default_max_tokens,
+                        temperature=temperature if temperature is not None else self.config.default_temperature,
+                        usage=usage,
+                        semantic_key=semantic_key
+                    )
+                async for chunk in chunks:
+                    pending.append(chunk)
+                    pending_chars += len(chunk)
+                    if pending_chars >= WRITE_BATCH_CHARS:
+                        await asyncio.to_thread(f.write, "".join(pending))
+                        pending = []
+                        pending_chars = 0
+                    yield chunk
+                
+                await asyncio.to_thread(_write_and_close, f, "".join(pending))
+            except BaseException:
+                # Don't leave a truncated document behind
+                f.close()
+                filepath.unlink(missing_ok=True)
+                raise
+            
+            # Provider-reported completion tokens (None if the provider sent no usage)
+            timer.set_tokens_used(usage.get('completion_tokens'))
+        
+        metadata = self._record_document(
+            doc_id=doc_id,
+            filename=filename,
+            doc_type=doc_type,
+            title=title,
+            context=context,
+            ai_provider=ai_provider,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        
+        if result is not None:
+            result.update({
+                'id': doc_id,
+                'filename': filename,
+                'metadata': metadata
+            })
+    
+    async def generate_documents_batch(
+        self,
+        jobs: List[Dict[str, Any]],
+        use_batch_api: bool = True,
+        ai_provider: Optional[str] = None,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> List[Any]:
+        """Generate many documents, using the provider Batch API when possible
+        
+        Each job is a dict with ``content``, ``doc_type``, ``title`` and optional
+        ``context``. Results are returned in job order; a failed job yields the
+        exception instead of a result dict, as with ``asyncio.gather``.
+        
+        Without the Batch API, documents are generated live, at most
+        MAX_CONCURRENT_LLM_CALLS at a time, and a job may also carry its own
+        ``ai_provider``, ``model``, ``max_tokens`` and ``temperature``.
+        """
+        provider = ai_provider.lower() if ai_provider else self.config.default_ai_provider
+        
+        # Batch jobs trade latency (up to 24h) for cost, so single documents and
+        # providers without a Batch API go through live generation instead
+        if not use_batch_api or len(jobs) < 2 or provider not in ("openai", "anthropic"):
+            semaphore = asyncio.Semaphore(self.config.max_concurrent_llm_calls)
+            settings = {'ai_provider': ai_provider, 'model': model, 'max_tokens': max_tokens, 'temperature': temperature}
+            
+            async def generate(job: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.generate_document(**{**settings, **job})
+            
+            return await asyncio.gather(*(generate(job) for job in jobs), return_exceptions=True)
+        
+        prompts = {}
+        doc_ids = []
+        for job in jobs:
+            prompt = self._build_prompt(job['doc_type'], job['content'], job['title'], job.get('context', ""))
+            doc_id = str(uuid.uuid4())
+            doc_ids.append(doc_id)
+            prompts[doc_id] = prompt
+        
+        logger.info("Generating %s documents via %s batch API", len(jobs), provider)
+        submitted = time.time()
+        try:
+            contents = await self.ai_client.generate_batch(
+                prompts,
+                provider=provider,
                 model=model or self.config.default_model,
-                max_tokens=max_tokens or self.config.default_max_tokens,
-                temperature=temperature or self.config.default_temperature
+                max_tokens=max_tokens if max_tokens is not None else self.config.default_max_tokens,
+                temperature=temperature if temperature is not None else self.config.default_temperature
             )
-            
-            # Estimate tokens used (rough approximation: 1 token ≈ 4 characters)
-            estimated_tokens = len(markdown_content) // 4
-            timer.set_tokens_used(estimated_tokens)
+        except Exception:
+            # Every job failed with the batch
+            for job in jobs:
+                self.metrics.record_document_generation_complete(
+                    doc_type=job['doc_type'],
+                    ai_provider=provider,
+                    model=model or self.config.default_model,
+                    duration=time.time() - submitted,
+                    success=False
+                )
+            raise
         
-        # Save document
-        doc_id = str(uuid.uuid4())
-        filename = f"{doc_id}_{doc_type}_{title.replace(' ', '_')}.md"
+        results = []
+        for doc_id, job in zip(doc_ids, jobs):
+            try:
+                with DocumentGenerationTimer(job['doc_type'], provider,
+                                            model or self.config.default_model, self.metrics) as timer:
+                    # Each job waited on the whole batch, so it is timed from submission
+                    timer.start_time = submitted
+                    if doc_id not in contents:
+                        logger.warning("Batch request failed for %s document: %s", job['doc_type'], job['title'])
+                        raise RuntimeError(f"Batch generation failed for document: {job['title']}")
+                    results.append(await self._save_document(
+                        doc_id=doc_id,
+                        markdown_content=contents[doc_id],
+                        doc_type=job['doc_type'],
+                        title=job['title'],
+                        context=job.get('context', ""),
+                        ai_provider=provider,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    ))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    def _document_filename(self, doc_id: str, doc_type: str, title: str) -> str:
+        """Build the output filename for a generated document
+        
+        Anything outside word characters, dots and dashes is replaced so a title
+        can never place the file outside the output directory.
+        """
+        safe_title = _SAFE_FILENAME.sub('_', title)[:MAX_FILENAME_TITLE]
+        return f"{doc_id}_{_filename_prefix(doc_type)}_{safe_title}.md"
+    
+    async def _save_document(
+        self,
+        doc_id: str,
+        markdown_content: str,
+        doc_type: str,
+        title: str,
+        context: str,
+        ai_provider: Optional[str],
+        model: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float]
+    ) -> Dict[str, Any]:
+        """Write a generated document to disk and record its metadata"""
+        filename = self._document_filename(doc_id, doc_type, title)
         filepath = self.output_dir / filename
         
-        # Write markdown file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Write markdown file without blocking the event loop
+        await asyncio.to_thread(filepath.write_text, markdown_content, encoding='utf-8')
         
-        # Update metadata
+        metadata = self._record_document(
+            doc_id=doc_id,
+            filename=filename,
+            doc_type=doc_type,
+            title=title,
+            context=context,
+            ai_provider=ai_provider,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        
+        return {
+            'id': doc_id,
+            'filename': filename,
+            'markdown': markdown_content,
+            'metadata': metadata
+        }
+    
+    def _record_document(
+        self,
+        doc_id: str,
+        filename: str,
+        doc_type: str,
+        title: str,
+        context: str,
+        ai_provider: Optional[str],
+        model: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float]
+    ) -> Dict[str, Any]:
+        """Record metadata for a document that has been written to disk"""
         self.metadata[doc_id] = {
             'id': doc_id,
             'title': title,
@@ -124,67 +495,79 @@ class DocumentGenerator:
             'created_at': datetime.now().isoformat(),
             'ai_provider': ai_provider or self.config.default_ai_provider,
             'model': model or self.config.default_model,
-            'max_tokens': max_tokens or self.config.default_max_tokens,
-            'temperature': temperature or self.config.default_temperature,
+            'max_tokens': max_tokens if max_tokens is not None else self.config.default_max_tokens,
+            'temperature': temperature if temperature is not None else self.config.default_temperature,
             'context': context
         }
-        self._save_metadata()
-        
-        logger.info(f"Generated document saved: {filename}")
+        self._filename_to_id[filename] = doc_id
+        self._by_type.setdefault(doc_type, []).append(doc_id)
+        self._queue_metadata(doc_id)
         
-        return {
-            'id': doc_id,
-            'filename': filename,
-            'markdown': markdown_content,
-            'metadata': self.metadata[doc_id]
-        }
+        logger.info("Generated document saved: %s", filename)
+        return self.metadata[doc_id]
     
-    def _build_prompt(self, template: str, content: str, title: str, context: str) -> str:
-        """Build the AI prompt from template and inputs"""
-        prompt = template.format(
+    def _build_prompt(self, doc_type: str, content: str, title: str, context: str) -> str:
+        """Build the AI prompt from the document type's template and inputs"""
+        prompt = self.templates.render(
+            doc_type,
             title=title,
             content=content,
             context=context if context else "No additional context provided."
         )
+        if prompt is None:
+            raise ValueError(f"Unknown document type: {doc_type}")
         return prompt
     
     def list_generated_documents(self, doc_type_filter: str = "") -> List[Dict[str, Any]]:
         """List all generated documents"""
-        documents = []
-        for doc_id, metadata in self.metadata.items():
-            if not doc_type_filter or metadata['doc_type'] == doc_type_filter:
-                documents.append(metadata)
+        if doc_type_filter:
+            doc_ids = self._by_type.get(doc_type_filter, [])
+        else:
+            doc_ids = self.metadata
         
-        # Sort by creation date (newest first)
-        documents.sort(key=lambda x: x['created_at'], reverse=True)
-        return documents
+        # Metadata is stored in creation order, so reversing gives newest first
+        return [self.metadata[doc_id] for doc_id in reversed(doc_ids)]
     
-    def get_generated_document(self, document_id: str) -> Optional[Dict[str, Any]]:
-        """Get a generated document by ID"""
-        if document_id not in self.metadata:
-            # Try to find by filename
-            for doc_id, metadata in self.metadata.items():
-                if metadata['filename'] == document_id or document_id in metadata['filename']:
-                    document_id = doc_id
-                    break
-            else:
-                return None
-        
-        metadata = self.metadata[document_id]
-        filepath = self.output_dir / metadata['filename']
+    def _find_document(self, document_id: str) -> Optional[str]:
+        """Resolve a document ID or (partial) filename to a document ID"""
+        if document_id in self.metadata:
+            return document_id
+        
+        # Try to find by exact filename, then by partial filename
+        doc_id = self._filename_to_id.get(document_id)
+        if doc_id is None:
+            doc_id = next(
+                (d for filename, d in self._filename_to_id.items() if document_id in filename),
+                None
+            )
+        return doc_id
+    
+    def get_generated_document_path(self, document_id: str) -> Optional[Path]:
+        """Get the file path of a generated document by ID, without reading it"""
+        doc_id = self._find_document(document_id)
+        if doc_id is None:
+            return None
         
+        filepath = self.output_dir / self.metadata[doc_id]['filename']
         if not filepath.exists():
-            logger.warning(f"Document file not found: {filepath}")
+            logger.warning("Document file not found: %s", filepath)
             return None
+        return filepath
+    
+    def get_generated_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get a generated document by ID"""
+        filepath = self.get_generated_document_path(document_id)
+        if filepath is None:
+            return None
+        
+        metadata = self.metadata[self._filename_to_id[filepath.name]]
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
+            # Decoding from the page-cache mapping skips the intermediate bytes copy of a read()
             return {
                 'metadata': metadata,
-                'content': content
+                'content': _read_text(filepath)
             }
         except Exception as e:
-            logger.error(f"Error reading document {document_id}: {e}")
+            logger.error("Error reading document %s: %s", document_id, e)
             return None
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Embedding-similarity cache for AI responses"""
+
+from typing import Dict, Hashable, List, Optional, Sequence
+
+
+class _Bucket:
+    """Fixed-size ring of normalized embeddings and their responses"""
+
+    __slots__ = ('vectors', 'scopes', 'responses', 'size', 'next')
+
+    def __init__(self, vectors, scopes):
+        self.vectors = vectors
+        self.scopes = scopes
+        self.responses: List[Optional[str]] = [None] * len(vectors)
+        self.size = 0
+        self.next = 0
+
+
+class SemanticCache:
+    """Reuse responses to prompts whose embeddings are nearly identical
+
+    Entries are grouped by a namespace (e.g. provider and model) so a response is
+    only reused for the same kind of request. Within a namespace an entry only
+    matches lookups with the same scope (e.g. the prompt around the embedded
+    text), compared by hash. Needs numpy, which is imported when
+    the cache is created so it stays an optional dependency.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        import numpy
+        self._np = numpy
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._buckets: Dict[Hashable, _Bucket] = {}
+
+    def _normalize(self, embedding: Sequence[float]):
+        """Embedding as a unit float32 vector, or None for a zero vector"""
+        vector = self._np.asarray(embedding, dtype=self._np.float32)
+        norm = self._np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, namespace: Hashable, embedding: Sequence[float], scope: Hashable = None) -> Optional[str]:
+        """Return the cached response most similar to the embedding within a scope, if it clears the threshold"""
+        bucket = self._buckets.get(namespace)
+        query = self._normalize(embedding)
+        if bucket is None or not bucket.size or query is None:
+            return None
+
+        # Rows are stored normalized, so the dot product is the cosine similarity
+        scores = bucket.vectors[:bucket.size] @ query
+        scores[bucket.scopes[:bucket.size] != hash(scope)] = -self._np.inf
+        best = int(scores.argmax())
+        return bucket.responses[best] if scores[best] >= self.threshold else None
+
+    def add(self, namespace: Hashable, embedding: Sequence[float], response: str, scope: Hashable = None):
+        """Store a response, overwriting the oldest entry of its namespace when full"""
+        vector = self._normalize(embedding)
+        if vector is None or self.max_entries <= 0:
+            return
+
+        bucket = self._buckets.get(namespace)
+        if bucket is None:
+            bucket = self._buckets[namespace] = _Bucket(
+                self._np.empty((self.max_entries, len(vector)), dtype=self._np.float32),
+                self._np.empty(self.max_entries, dtype=self._np.int64)
+            )
+
+        bucket.vectors[bucket.next] = vector
+        bucket.scopes[bucket.next] = hash(scope)
+        bucket.responses[bucket.next] = response
+        bucket.next = (bucket.next + 1) % self.max_entries
+        bucket.size = min(bucket.size + 1, self.max_entries)
@@ -1,129 +1,241 @@
 """Document templates and prompts for different documentation types"""
 
-import json
-from pathlib import Path
-from typing import Dict, Optional
+import hashlib
+import mmap
+import os
+import string
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Set, Tuple
+
+import orjson
 
 from utils.logger import setup_logger
 
-logger = setup_logger(__name__)
+# Set up on first use; most runs never log from this module
+_logger = None
+
+def _log():
+    """Get the module logger, creating it on first use"""
+    global _logger
+    if _logger is None:
+        _logger = setup_logger(__name__)
+    return _logger
+
+DEFAULT_TEMPLATES_DIR = '/app/data/templates'
+
+# Placeholders filled in by DocumentTemplates.render
+TEMPLATE_FIELDS = frozenset({'title', 'content', 'context'})
+
+@lru_cache(maxsize=128)
+def _compile(template: str) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """Split a template into literals and fields once, so rendering skips str.format parsing
+    
+    Returns ``(literals, fields)`` with one more literal than fields, the
+    template being ``literals[0] + value(fields[0]) + literals[1] + ...``.
+    Adjacent literal pieces (e.g. around escaped braces) are merged. Returns
+    None when the template uses anything beyond plain {title}, {content} and
+    {context} placeholders; those templates are rendered with str.format.
+    """
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError:
+        return None
+    
+    literals = [""]
+    fields = []
+    for literal, field, format_spec, conversion in parsed:
+        if field is not None and (field not in TEMPLATE_FIELDS or format_spec or conversion):
+            return None
+        literals[-1] += literal
+        if field is not None:
+            fields.append(field)
+            literals.append("")
+    return tuple(literals), tuple(fields)
+
+@lru_cache(maxsize=128)
+def _renderer(template: str) -> Optional[Callable[[str, str, str], str]]:
+    """Generate a function that renders a template as one f-string, or None if it can't be compiled
+    
+    The literals are bound as globals of the generated function rather than
+    spliced into its source, so template text never needs escaping.
+    """
+    plan = _compile(template)
+    if plan is None:
+        return None
+    
+    literals, fields = plan
+    namespace = {f"_s{i}": literal for i, literal in enumerate(literals)}
+    body = "".join(f"{{_s{i}}}{{{field}}}" for i, field in enumerate(fields)) + f"{{_s{len(fields)}}}"
+    exec(f'def render(title, content, context):\n    return f"{body}"', namespace)
+    return namespace['render']
+
+def _serialize(custom_templates: Dict[str, Dict[str, str]]) -> bytes:
+    """Encode custom templates the way they are written to the templates file"""
+    return orjson.dumps(custom_templates, option=orjson.OPT_INDENT_2)
 
 class DocumentTemplates:
     """Manages document templates and prompts"""
     
+    # Shared instances handed out by get(), keyed by templates dir and the
+    # mtime of its custom templates file (None when the file doesn't exist)
+    _INSTANCE_CACHE: Dict[Tuple[str, Optional[int]], 'DocumentTemplates'] = {}
+    
+    # Parsed custom templates files and the digest of their content, keyed by (path, mtime_ns, size)
+    _CUSTOM_CACHE: Dict[Tuple[str, int, int], Tuple[Dict[str, Dict[str, str]], bytes]] = {}
+    
+    # Templates directories already created by this process
+    _ENSURED_DIRS: Set[str] = set()
+    
+    @classmethod
+    def get(cls, templates_dir: Optional[str] = None) -> 'DocumentTemplates':
+        """Get a shared instance for a templates directory
+        
+        The instance is reused until custom_templates.json changes on disk, so
+        repeat callers skip re-reading and re-parsing it.
+        """
+        path = os.fspath(templates_dir or DEFAULT_TEMPLATES_DIR)
+        try:
+            mtime = os.stat(os.path.join(path, 'custom_templates.json')).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        key = (path, mtime)
+        instance = cls._INSTANCE_CACHE.get(key)
+        if instance is None:
+            # Forget instances built from an older version of the file
+            for stale_key in [k for k in cls._INSTANCE_CACHE if k[0] == path]:
+                del cls._INSTANCE_CACHE[stale_key]
+            instance = cls._INSTANCE_CACHE[key] = cls(path)
+        return instance
+    
     def __init__(self, templates_dir: Optional[str] = None):
         # Allow configurable templates directory (helps tests and non-container runs)
-        if templates_dir:
-            self.templates_dir = Path(templates_dir)
-        else:
-            self.templates_dir = Path('/app/data/templates')
-
-        self.custom_templates_file = self.templates_dir / 'custom_templates.json'
+        # Paths are kept as plain strings; they are only used for a few os calls
+        self.templates_dir = os.fspath(templates_dir or DEFAULT_TEMPLATES_DIR)
+        self.custom_templates_file = os.path.join(self.templates_dir, 'custom_templates.json')
         
-        # Ensure templates directory exists (best-effort)
-        try:
-            self.templates_dir.mkdir(parents=True, exist_ok=True)
-        except Exception:
-            # If we can't create the desired path (e.g., permissions), fall back silently
-            # The caller (e.g., DocumentGenerator) should pass a writable path when possible
-            pass
+        # Ensure templates directory exists (best-effort, once per path per process)
+        if self.templates_dir not in self._ENSURED_DIRS:
+            try:
+                os.makedirs(self.templates_dir, exist_ok=True)
+                self._ENSURED_DIRS.add(self.templates_dir)
+            except OSError:
+                # If we can't create the desired path (e.g., permissions), fall back silently
+                # The caller (e.g., DocumentGenerator) should pass a writable path when possible
+                pass
         
         # Load custom templates
+        self._last_saved_digest: Optional[bytes] = None
         self._load_custom_templates()
         
-        # Built-in templates
-        self.builtin_templates = {
-            'sop': {
-                'description': 'Standard Operating Procedure - Step-by-step process documentation',
-                'template': self._get_sop_template()
-            },
-            'runbook': {
-                'description': 'Operational Runbook - Troubleshooting and maintenance procedures',
-                'template': self._get_runbook_template()
-            },
-            'architecture': {
-                'description': 'High-level Architectural Documentation - System design and components',
-                'template': self._get_architecture_template()
-            },
-            'implementation': {
-                'description': 'Implementation-level Documentation - Detailed technical specifications',
-                'template': self._get_implementation_template()
-            },
-            'meeting_summary': {
-                'description': 'Meeting Summary - Key decisions, action items, and outcomes',
-                'template': self._get_meeting_summary_template()
-            },
-            'technical_spec': {
-                'description': 'Technical Specification - Detailed feature or component specification',
-                'template': self._get_technical_spec_template()
-            },
-            'api_doc': {
-                'description': 'API Documentation - Endpoints, parameters, and usage examples',
-                'template': self._get_api_doc_template()
-            },
-            'user_guide': {
-                'description': 'User Guide - End-user documentation and tutorials',
-                'template': self._get_user_guide_template()
-            },
-            'technical_doc': {
-                'description': 'Technical Documentation - Structured and well formatted documentation for technical scenarios',
-                'template': self._get_technical_documentation_template()
-            },
-        }
+        # Built-in templates (read-only and shared by every instance)
+        self.builtin_templates = _BUILTINS
+        
+        # Single lookup table for get_template; custom types override built-ins
+        self._merged_view = {**self.builtin_templates, **self.custom_templates}
+        self._all_types = MappingProxyType(self._merged_view)
+        
+        # Compiled render functions by doc type, filled in as types are rendered
+        self._renderers: Dict[str, Callable[[str, str, str], str]] = {}
     
     def _load_custom_templates(self):
-        """Load custom templates from file"""
-        if self.custom_templates_file.exists():
+        """Load custom templates from file, reusing the parsed result while the file is unchanged"""
+        try:
+            st = os.stat(self.custom_templates_file)
+        except OSError:
+            self.custom_templates = {}
+            return
+        
+        key = (self.custom_templates_file, st.st_mtime_ns, st.st_size)
+        cached = self._CUSTOM_CACHE.get(key)
+        if cached is None:
             try:
-                with open(self.custom_templates_file, 'r') as f:
-                    self.custom_templates = json.load(f)
+                # Parse straight from the mapped file so large template libraries
+                # aren't copied into an intermediate bytes object first
+                with open(self.custom_templates_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                        memoryview(mm) as view:
+                    loaded = orjson.loads(view)
+                # Intern doc type keys like the built-in ones, which the compiler interns
+                templates = {sys.intern(k): v for k, v in loaded.items()}
+                cached = (templates, hashlib.blake2b(_serialize(templates)).digest())
             except Exception as e:
-                logger.warning(f"Could not load custom templates: {e}")
+                _log().warning("Could not load custom templates: %s", e)
                 self.custom_templates = {}
-        else:
-            self.custom_templates = {}
+                return
+            for stale_key in [k for k in self._CUSTOM_CACHE if k[0] == key[0]]:
+                del self._CUSTOM_CACHE[stale_key]
+            self._CUSTOM_CACHE[key] = cached
+        
+        # Copy so add_custom_type doesn't change the cached dict, and remember what is
+        # on disk so saving unchanged templates doesn't rewrite the file
+        self.custom_templates = dict(cached[0])
+        self._last_saved_digest = cached[1]
     
     def _save_custom_templates(self):
-        """Save custom templates to file"""
+        """Save custom templates to file, skipping the write if nothing changed"""
         try:
-            with open(self.custom_templates_file, 'w') as f:
-                json.dump(self.custom_templates, f, indent=2)
+            data = _serialize(self.custom_templates)
+            digest = hashlib.blake2b(data).digest()
+            if digest == self._last_saved_digest:
+                return
+            
+            # Write to a temp file and swap it in so an interrupted save never
+            # leaves a truncated templates file behind
+            tmp_file = self.custom_templates_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.custom_templates_file)
+            self._last_saved_digest = digest
         except Exception as e:
-            logger.error(f"Could not save custom templates: {e}")
+            _log().error("Could not save custom templates: %s", e)
     
-    def get_all_types(self) -> Dict[str, Dict[str, str]]:
-        """Get all available document types"""
-        all_types = {}
-        all_types.update(self.builtin_templates)
-        all_types.update(self.custom_templates)
-        return all_types
+    def get_all_types(self) -> Mapping[str, Dict[str, str]]:
+        """Get all available document types as a read-only live view"""
+        return self._all_types
     
     def get_template(self, doc_type: str) -> Optional[str]:
         """Get template for a document type"""
-        if doc_type in self.builtin_templates:
-            return self.builtin_templates[doc_type]['template']
-        elif doc_type in self.custom_templates:
-            return self.custom_templates[doc_type]['template']
-        else:
-            return None
+        entry = self._merged_view.get(doc_type)
+        return entry and entry.get('template')
+    
+    def render(self, doc_type: str, title: str, content: str, context: str) -> Optional[str]:
+        """Fill in the template for a document type, or return None if the type is unknown"""
+        renderer = self._renderers.get(doc_type)
+        if renderer is None:
+            template = self.get_template(doc_type)
+            if template is None:
+                return None
+            
+            renderer = _renderer(template)
+            if renderer is None:
+                return template.format(title=title, content=content, context=context)
+            self._renderers[doc_type] = renderer
+        return renderer(title, content, context)
     
     def add_custom_type(self, doc_type: str, description: str, template: str) -> bool:
         """Add a custom document type"""
         try:
-            self.custom_templates[doc_type] = {
+            doc_type = sys.intern(doc_type)
+            self.custom_templates[doc_type] = self._merged_view[doc_type] = {
                 'description': description,
                 'template': template
             }
+            self._renderers.pop(doc_type, None)
             self._save_custom_templates()
-            logger.info(f"Added custom document type: {doc_type}")
+            _log().info("Added custom document type: %s", doc_type)
             return True
         except Exception as e:
-            logger.error(f"Error adding custom type {doc_type}: {e}")
+            _log().error("Error adding custom type %s: %s", doc_type, e)
             return False
-    
-    def _get_sop_template(self) -> str:
-        """Standard Operating Procedure template"""
-        return """Create a comprehensive Standard Operating Procedure (SOP) document based on the following meeting content.
+
+
+# Standard Operating Procedure template
+_SOP_TEMPLATE = """Create a comprehensive Standard Operating Procedure (SOP) document based on the following meeting content.
 
 **Title:** {title}
 
@@ -144,10 +256,9 @@ Please create a well-structured SOP document in markdown format that includes:
 7. **References** - Related documents or resources
 
 Format the document with clear headings, bullet points, and code blocks where appropriate. Make it actionable and easy to follow for someone unfamiliar with the process."""
-    
-    def _get_runbook_template(self) -> str:
-        """Operational Runbook template"""
-        return """Create a comprehensive Operational Runbook based on the following meeting content.
+
+# Operational Runbook template
+_RUNBOOK_TEMPLATE = """Create a comprehensive Operational Runbook based on the following meeting content.
 
 **Title:** {title}
 
@@ -171,10 +282,9 @@ Please create a well-structured runbook document in markdown format that include
 10. **References** - Links to logs, dashboards, and related documentation
 
 Focus on operational scenarios, include command examples, and make it practical for on-call engineers."""
-    
-    def _get_architecture_template(self) -> str:
-        """High-level Architecture template"""
-        return """Create comprehensive high-level architectural documentation based on the following meeting content.
+
+# High-level Architecture template
+_ARCHITECTURE_TEMPLATE = """Create comprehensive high-level architectural documentation based on the following meeting content.
 
 **Title:** {title}
 
@@ -199,10 +309,9 @@ Please create a well-structured architecture document in markdown format that in
 11. **Future Considerations** - Planned improvements and potential challenges
 
 Focus on the big picture, avoid implementation details, and make it accessible to both technical and non-technical stakeholders."""
-    
-    def _get_implementation_template(self) -> str:
-        """Implementation-level Documentation template"""
-        return """Create detailed implementation-level documentation based on the following meeting content.
+
+# Implementation-level Documentation template
+_IMPLEMENTATION_TEMPLATE = """Create detailed implementation-level documentation based on the following meeting content.
 
 **Title:** {title}
 
@@ -229,10 +338,9 @@ Please create a comprehensive implementation document in markdown format that in
 13. **Code Examples** - Key implementation snippets and usage examples
 
 Focus on technical details that developers need to understand, maintain, and extend the implementation."""
-    
-    def _get_meeting_summary_template(self) -> str:
-        """Meeting Summary template"""
-        return """Create a comprehensive meeting summary based on the following content.
+
+# Meeting Summary template
+_MEETING_SUMMARY_TEMPLATE = """Create a comprehensive meeting summary based on the following content.
 
 **Meeting Title:** {title}
 
@@ -253,10 +361,9 @@ Please create a well-structured meeting summary in markdown format that includes
 7. **Resources Mentioned** - Links, documents, or tools referenced
 
 Extract the most important information and present it in a clear, actionable format."""
-    
-    def _get_technical_spec_template(self) -> str:
-        """Technical Specification template"""
-        return """Create a detailed technical specification based on the following meeting content.
+
+# Technical Specification template
+_TECHNICAL_SPEC_TEMPLATE = """Create a detailed technical specification based on the following meeting content.
 
 **Feature/Component:** {title}
 
@@ -282,10 +389,9 @@ Please create a comprehensive technical specification in markdown format that in
 12. **Risks and Assumptions** - Potential issues and assumptions made
 
 Focus on providing clear, testable requirements that can guide implementation."""
-    
-    def _get_api_doc_template(self) -> str:
-        """API Documentation template"""
-        return """Create comprehensive API documentation based on the following meeting content.
+
+# API Documentation template
+_API_DOC_TEMPLATE = """Create comprehensive API documentation based on the following meeting content.
 
 **API Title:** {title}
 
@@ -313,10 +419,9 @@ Please create detailed API documentation in markdown format that includes:
 10. **Changelog** - API version history and changes
 
 Make it practical for developers to integrate with the API quickly."""
-    
-    def _get_user_guide_template(self) -> str:
-        """User Guide template"""
-        return """Create a comprehensive user guide based on the following meeting content.
+
+# User Guide template
+_USER_GUIDE_TEMPLATE = """Create a comprehensive user guide based on the following meeting content.
 
 **Product/Feature:** {title}
 
@@ -341,9 +446,8 @@ Please create a user-friendly guide in markdown format that includes:
 
 Write in a friendly, accessible tone that non-technical users can understand. Include screenshots descriptions where helpful."""
 
-    def _get_technical_documentation_template(self) -> str:
-        """Technical Documentation template"""
-        return """Create a comprehensive techhical document, written by a technical writer, based on the following content and context.
+# Technical Documentation template
+_TECHNICAL_DOCUMENTATION_TEMPLATE = """Create a comprehensive techhical document, written by a technical writer, based on the following content and context.
 
 **Document Title:** {title}
 
@@ -363,4 +467,44 @@ Please create a well-structured technical document in markdown format that:
 6. Does not use periods, exclamation points, question marks, etc. on sentences within bulleted or numbered lists
 7. Provides code snippets or other bread crumbs for further clarity
 
-Return document in the format outlined in the above steps."""
\ No newline at end of file
+Return document in the format outlined in the above steps."""
+
+# Built-in document types, shared read-only by every DocumentTemplates instance
+_BUILTINS = MappingProxyType({
+    'sop': MappingProxyType({
+        'description': 'Standard Operating Procedure - Step-by-step process documentation',
+        'template': _SOP_TEMPLATE
+    }),
+    'runbook': MappingProxyType({
+        'description': 'Operational Runbook - Troubleshooting and maintenance procedures',
+        'template': _RUNBOOK_TEMPLATE
+    }),
+    'architecture': MappingProxyType({
+        'description': 'High-level Architectural Documentation - System design and components',
+        'template': _ARCHITECTURE_TEMPLATE
+    }),
+    'implementation': MappingProxyType({
+        'description': 'Implementation-level Documentation - Detailed technical specifications',
+        'template': _IMPLEMENTATION_TEMPLATE
+    }),
+    'meeting_summary': MappingProxyType({
+        'description': 'Meeting Summary - Key decisions, action items, and outcomes',
+        'template': _MEETING_SUMMARY_TEMPLATE
+    }),
+    'technical_spec': MappingProxyType({
+        'description': 'Technical Specification - Detailed feature or component specification',
+        'template': _TECHNICAL_SPEC_TEMPLATE
+    }),
+    'api_doc': MappingProxyType({
+        'description': 'API Documentation - Endpoints, parameters, and usage examples',
+        'template': _API_DOC_TEMPLATE
+    }),
+    'user_guide': MappingProxyType({
+        'description': 'User Guide - End-user documentation and tutorials',
+        'template': _USER_GUIDE_TEMPLATE
+    }),
+    'technical_doc': MappingProxyType({
+        'description': 'Technical Documentation - Structured and well formatted documentation for technical scenarios',
+        'template': _TECHNICAL_DOCUMENTATION_TEMPLATE
+    }),
+})
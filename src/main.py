@@ -7,322 +7,538 @@ Supports multiple document types with modular architecture for easy extension.
 """
 
 import asyncio
+import functools
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import re
+import signal
+import string
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import (
     Resource,
+    ResourceLink,
     Tool,
     TextContent,
     ImageContent,
     EmbeddedResource,
 )
 
-from generators.document_generator import DocumentGenerator
-from utils.config import Config
-from utils.logger import setup_logger
+from generators.templates import DocumentTemplates
+from utils.config import get_config
+from utils.logger import refresh_hostname, setup_logger
+
+if TYPE_CHECKING:
+    from generators.document_generator import DocumentGenerator
 
 # Setup configuration first
-config = Config()
+config = get_config()
 
 # Setup logging with config
 logger = setup_logger(__name__, config=config)
 
+# Input schemas of the MCP tools, built once at import
+_LIST_TYPES_SCHEMA = {
+    "type": "object",
+    "properties": {},
+    "required": []
+}
+
+_GENERATE_DOCUMENTATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "content": {
+            "type": "string",
+            "description": "The meeting content (notes, transcription, or chat log)"
+        },
+        "doc_type": {
+            "type": "string",
+            "description": "Type of documentation to generate (sop, runbook, architecture, implementation, etc.)"
+        },
+        "title": {
+            "type": "string",
+            "description": "Title for the generated document"
+        },
+        "context": {
+            "type": "string",
+            "description": "Additional context or requirements for the documentation",
+            "default": ""
+        },
+        "ai_provider": {
+            "type": "string",
+            "description": "AI provider to use (openai, anthropic, openrouter)",
+            "default": "openai"
+        },
+        "model": {
+            "type": "string",
+            "description": "AI model to use",
+            "default": "gpt-4o-mini"
+        },
+        "max_tokens": {
+            "type": "integer",
+            "description": "Maximum tokens for AI generation",
+            "default": 4000
+        },
+        "temperature": {
+            "type": "number",
+            "description": "Temperature for AI generation (0.0-1.0)",
+            "default": 0.3
+        }
+    },
+    "required": ["content", "doc_type", "title"]
+}
+
+_GENERATE_DOCUMENTATION_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "description": "Documents to generate, each with the arguments of generate_documentation",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "content": {"type": "string", "description": "The meeting content"},
+                    "doc_type": {"type": "string", "description": "Type of documentation to generate"},
+                    "title": {"type": "string", "description": "Title for the generated document"},
+                    "context": {"type": "string", "description": "Additional context (optional)"},
+                    "ai_provider": {"type": "string", "description": "AI provider to use (optional)"},
+                    "model": {"type": "string", "description": "AI model to use (optional)"},
+                    "max_tokens": {"type": "integer", "description": "Maximum tokens for AI generation (optional)"},
+                    "temperature": {"type": "number", "description": "Temperature for AI generation (optional)"}
+                },
+                "required": ["content", "doc_type", "title"]
+            }
+        }
+    },
+    "required": ["items"]
+}
+
+_GET_TEMPLATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "doc_type": {
+            "type": "string",
+            "description": "Type of documentation template to retrieve"
+        }
+    },
+    "required": ["doc_type"]
+}
+
+_TRANSFORM_TEXT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "text": {"type": "string", "description": "The text to transform"},
+        "prompt": {"type": "string", "description": "Prompt or template to apply to the text (may include {content})"},
+        "ai_provider": {"type": "string", "description": "AI provider to use (optional)"},
+        "model": {"type": "string", "description": "Model to use (optional)"},
+        "max_tokens": {"type": "integer", "description": "Max tokens for generation (optional)"},
+        "temperature": {"type": "number", "description": "Temperature for generation (optional)"}
+    },
+    "required": ["text", "prompt"]
+}
+
+_ADD_TYPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "doc_type": {
+            "type": "string",
+            "description": "Name of the new document type"
+        },
+        "description": {
+            "type": "string",
+            "description": "Description of what this document type generates"
+        },
+        "template": {
+            "type": "string",
+            "description": "Template/prompt for generating this document type"
+        }
+    },
+    "required": ["doc_type", "description", "template"]
+}
+
+_LIST_DOCUMENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "doc_type": {
+            "type": "string",
+            "description": "Filter by document type (optional)",
+            "default": ""
+        }
+    },
+    "required": []
+}
+
+_GET_DOCUMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "document_id": {
+            "type": "string",
+            "description": "ID or filename of the document to retrieve"
+        },
+        "return_handle": {
+            "type": "boolean",
+            "description": "Return a link to the document file instead of its content",
+            "default": False
+        }
+    },
+    "required": ["document_id"]
+}
+
+# The MCP tools offered by the server; the list never changes
+_TOOLS: Tuple[Tool, ...] = (
+    Tool(
+        name="list_document_types",
+        description="List all available documentation types that can be generated",
+        inputSchema=_LIST_TYPES_SCHEMA
+    ),
+    Tool(
+        name="generate_documentation",
+        description="Generate documentation from meeting content (notes, transcriptions, or chats)",
+        inputSchema=_GENERATE_DOCUMENTATION_SCHEMA
+    ),
+    Tool(
+        name="generate_documentation_batch",
+        description="Generate several documents concurrently from meeting content",
+        inputSchema=_GENERATE_DOCUMENTATION_BATCH_SCHEMA
+    ),
+    Tool(
+        name="get_document_template",
+        description="Get the template/prompt for a specific document type",
+        inputSchema=_GET_TEMPLATE_SCHEMA
+    ),
+    Tool(
+        name="transform_text",
+        description="Transform arbitrary text using a provided prompt via the configured AI provider",
+        inputSchema=_TRANSFORM_TEXT_SCHEMA
+    ),
+    Tool(
+        name="add_document_type",
+        description="Add a new document type with custom template/prompt",
+        inputSchema=_ADD_TYPE_SCHEMA
+    ),
+    Tool(
+        name="list_generated_documents",
+        description="List all previously generated documents",
+        inputSchema=_LIST_DOCUMENTS_SCHEMA
+    ),
+    Tool(
+        name="get_generated_document",
+        description="Retrieve a previously generated document",
+        inputSchema=_GET_DOCUMENT_SCHEMA
+    ),
+)
+
+# Forwards output of the tool call being handled to the client as progress
+# notifications; unset when the client didn't send a progress token
+_progress_sender: ContextVar[Optional[Callable[[float, str], Awaitable[None]]]] = ContextVar(
+    '_progress_sender', default=None
+)
+
+# Rendered get_document_template responses kept, least recently used dropped first
+TEMPLATE_CACHE_SIZE = 64
+
+# Environment variables whose values are masked in debug logs
+_SECRET_NAME = re.compile(r"(KEY|PASSWORD|TOKEN|SECRET)$", re.IGNORECASE)
+
+def _redact(key: str, value: Any) -> Any:
+    """Mask the value of a secret-looking setting for logging"""
+    return "****" if _SECRET_NAME.search(key) else value
+
+def _prompt_prefix(prompt: str) -> str:
+    """Literal text of a prompt template before its first placeholder"""
+    try:
+        literal, field, _, _ = next(iter(string.Formatter().parse(prompt)))
+    except (StopIteration, ValueError):
+        return ""
+    return literal if field is not None else ""
+
+def tool_handler(handler):
+    """Turn exceptions raised by a tool handler into an error result for the client"""
+    @functools.wraps(handler)
+    async def wrapper(self, arguments: Dict[str, Any]):
+        try:
+            return await handler(self, arguments)
+        except Exception as e:
+            logger.exception("Error in %s: %s", handler.__name__, e)
+            return [TextContent(type="text", text=f"Error: {str(e)}")]
+    return wrapper
+
+@dataclass(frozen=True, slots=True)
+class LLMCallParams:
+    """Generation settings of a tool call, with config defaults filled in"""
+    provider: str
+    model: str
+    max_tokens: int
+    temperature: float
+
 class DocumentationGeneratorServer:
     """MCP Server for generating documentation from meeting content"""
     
     def __init__(self):
         self.config = config  # Use the global config instance
-        self.generator = DocumentGenerator(self.config)
+        # Created on first use: the generator pulls in the AI client, metrics
+        # and document store, which template-only tools don't need
+        self._generator = None
+        
+        # Shared by every list_tools request
+        self._tools = list(_TOOLS)
+        
+        # Rendered discovery responses with their expiry times (time.monotonic()),
+        # dropped when a document type is added
+        self._types_cache: Tuple[Optional[str], float] = (None, 0.0)
+        self._template_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        
+        # Tool name -> handler, for the call_tool dispatcher
+        self._dispatch = {
+            "list_document_types": self.handle_list_document_types,
+            "generate_documentation": self.handle_generate_documentation,
+            "generate_documentation_batch": self.handle_generate_documentation_batch,
+            "get_document_template": self.handle_get_document_template,
+            "add_document_type": self.handle_add_document_type,
+            "transform_text": self.handle_transform_text,
+            "list_generated_documents": self.handle_list_generated_documents,
+            "get_generated_document": self.handle_get_generated_document,
+        }
         logger.info("Documentation Generator MCP Server initialized")
     
+    @property
+    def generator(self) -> "DocumentGenerator":
+        """Document generator, created on first use"""
+        if self._generator is None:
+            from generators.document_generator import DocumentGenerator
+            self._generator = DocumentGenerator(self.config)
+        return self._generator
+    
+    @property
+    def templates(self) -> DocumentTemplates:
+        """Document templates, without creating the generator if it isn't needed yet"""
+        if self._generator is not None:
+            return self._generator.templates
+        return DocumentTemplates.get(self.config.templates_dir)
+    
     def get_available_tools(self) -> List[Tool]:
         """Return list of available MCP tools"""
-        return [
-            Tool(
-                name="list_document_types",
-                description="List all available documentation types that can be generated",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            ),
-            Tool(
-                name="generate_documentation",
-                description="Generate documentation from meeting content (notes, transcriptions, or chats)",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "content": {
-                            "type": "string",
-                            "description": "The meeting content (notes, transcription, or chat log)"
-                        },
-                        "doc_type": {
-                            "type": "string",
-                            "description": "Type of documentation to generate (sop, runbook, architecture, implementation, etc.)"
-                        },
-                        "title": {
-                            "type": "string",
-                            "description": "Title for the generated document"
-                        },
-                        "context": {
-                            "type": "string",
-                            "description": "Additional context or requirements for the documentation",
-                            "default": ""
-                        },
-                        "ai_provider": {
-                            "type": "string",
-                            "description": "AI provider to use (openai, anthropic, openrouter)",
-                            "default": "openai"
-                        },
-                        "model": {
-                            "type": "string",
-                            "description": "AI model to use",
-                            "default": "gpt-4o-mini"
-                        },
-                        "max_tokens": {
-                            "type": "integer",
-                            "description": "Maximum tokens for AI generation",
-                            "default": 4000
-                        },
-                        "temperature": {
-                            "type": "number",
-                            "description": "Temperature for AI generation (0.0-1.0)",
-                            "default": 0.3
-                        }
-                    },
-                    "required": ["content", "doc_type", "title"]
-                }
-            ),
-            Tool(
-                name="get_document_template",
-                description="Get the template/prompt for a specific document type",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "doc_type": {
-                            "type": "string",
-                            "description": "Type of documentation template to retrieve"
-                        }
-                    },
-                    "required": ["doc_type"]
-                }
-            ),
-            Tool(
-                name="transform_text",
-                description="Transform arbitrary text using a provided prompt via the configured AI provider",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "text": {"type": "string", "description": "The text to transform"},
-                        "prompt": {"type": "string", "description": "Prompt or template to apply to the text (may include {content})"},
-                        "ai_provider": {"type": "string", "description": "AI provider to use (optional)"},
-                        "model": {"type": "string", "description": "Model to use (optional)"},
-                        "max_tokens": {"type": "integer", "description": "Max tokens for generation (optional)"},
-                        "temperature": {"type": "number", "description": "Temperature for generation (optional)"}
-                    },
-                    "required": ["text", "prompt"]
-                }
-            ),
-            Tool(
-                name="add_document_type",
-                description="Add a new document type with custom template/prompt",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "doc_type": {
-                            "type": "string",
-                            "description": "Name of the new document type"
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "Description of what this document type generates"
-                        },
-                        "template": {
-                            "type": "string",
-                            "description": "Template/prompt for generating this document type"
-                        }
-                    },
-                    "required": ["doc_type", "description", "template"]
-                }
-            ),
-            Tool(
-                name="list_generated_documents",
-                description="List all previously generated documents",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "doc_type": {
-                            "type": "string",
-                            "description": "Filter by document type (optional)",
-                            "default": ""
-                        }
-                    },
-                    "required": []
-                }
-            ),
-            Tool(
-                name="get_generated_document",
-                description="Retrieve a previously generated document",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "document_id": {
-                            "type": "string",
-                            "description": "ID or filename of the document to retrieve"
-                        }
-                    },
-                    "required": ["document_id"]
-                }
-            )
-        ]
+        return self._tools
+    
+    def _parse_llm_params(self, arguments: Dict[str, Any]) -> LLMCallParams:
+        """Read the generation settings of a tool call"""
+        c = self.config
+        return LLMCallParams(
+            provider=arguments.get("ai_provider", c.default_ai_provider),
+            model=arguments.get("model", c.default_model),
+            max_tokens=arguments.get("max_tokens", c.default_max_tokens),
+            temperature=arguments.get("temperature", c.default_temperature)
+        )
     
+    @tool_handler
     async def handle_list_document_types(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """List all available documentation types"""
-        try:
-            doc_types = self.generator.get_available_types()
+        now = time.monotonic()
+        result, expires = self._types_cache
+        if result is None or now > expires:
+            doc_types = self.templates.get_all_types()
             
-            result = "# Available Documentation Types\n\n"
+            parts = ["# Available Documentation Types\n\n"]
             for doc_type, info in doc_types.items():
-                result += f"## {doc_type}\n"
-                result += f"**Description:** {info['description']}\n\n"
+                parts.append(f"## {doc_type}\n**Description:** {info['description']}\n\n")
             
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            logger.error(f"Error listing document types: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+            result = "".join(parts)
+            self._types_cache = (result, now + self.config.discovery_cache_ttl)
+        
+        return [TextContent(type="text", text=result)]
     
+    @tool_handler
     async def handle_generate_documentation(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """Generate documentation from meeting content"""
-        try:
-            content = arguments["content"]
-            doc_type = arguments["doc_type"]
-            title = arguments["title"]
-            context = arguments.get("context", "")
-            ai_provider = arguments.get("ai_provider", self.config.default_ai_provider)
-            model = arguments.get("model", self.config.default_model)
-            max_tokens = arguments.get("max_tokens", self.config.default_max_tokens)
-            temperature = arguments.get("temperature", self.config.default_temperature)
-            
-            # Generate the documentation
-            result = await self.generator.generate_document(
-                content=content,
-                doc_type=doc_type,
-                title=title,
-                context=context,
-                ai_provider=ai_provider,
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            
-            return [TextContent(type="text", text=result["markdown"])]
-            
-        except Exception as e:
-            logger.error(f"Error generating documentation: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+        content = arguments["content"]
+        doc_type = arguments["doc_type"]
+        title = arguments["title"]
+        context = arguments.get("context", "")
+        params = self._parse_llm_params(arguments)
+        
+        # Stream the documentation, passing chunks on to the client as they arrive
+        send_progress = _progress_sender.get()
+        parts = []
+        received = 0
+        async for chunk in self.generator.generate_document_stream(
+            content=content,
+            doc_type=doc_type,
+            title=title,
+            context=context,
+            # Left unset when not given, so the generator may race providers (AI_RACE_ENABLED)
+            ai_provider=arguments.get("ai_provider"),
+            model=params.model,
+            max_tokens=params.max_tokens,
+            temperature=params.temperature
+        ):
+            parts.append(chunk)
+            received += len(chunk)
+            if send_progress is not None:
+                await send_progress(received, chunk)
+        
+        return [TextContent(type="text", text="".join(parts))]
+    
+    @tool_handler
+    async def handle_generate_documentation_batch(self, arguments: Dict[str, Any]) -> List[TextContent]:
+        """Generate several documents concurrently"""
+        items = arguments["items"]
+        
+        # Live generation: the caller is waiting, so the Batch API's latency doesn't fit
+        results = await self.generator.generate_documents_batch(items, use_batch_api=False)
+        
+        sections = []
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                logger.error("Error generating documentation for %s: %s", item.get('title'), result)
+                sections.append(f"# {item.get('title')}\n\nError: {str(result)}")
+            else:
+                sections.append(result["markdown"])
+        
+        return [TextContent(type="text", text="\n\n---\n\n".join(sections))]
     
+    @tool_handler
     async def handle_get_document_template(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """Get template for a document type"""
-        try:
-            doc_type = arguments["doc_type"]
-            template = self.generator.get_template(doc_type)
-            
-            result = f"# Template for {doc_type}\n\n```\n{template}\n```"
+        doc_type = arguments["doc_type"]
+        now = time.monotonic()
+        result, expires = self._template_cache.get(doc_type, (None, 0.0))
+        if result is not None and now <= expires:
+            self._template_cache.move_to_end(doc_type)
             return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            logger.error(f"Error getting template: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+        
+        template = self.templates.get_template(doc_type)
+        result = f"# Template for {doc_type}\n\n```\n{template}\n```"
+        
+        # Unknown types aren't cached; the doc type comes from the client
+        if template is not None:
+            self._template_cache[doc_type] = (result, now + self.config.discovery_cache_ttl)
+            self._template_cache.move_to_end(doc_type)
+            while len(self._template_cache) > TEMPLATE_CACHE_SIZE:
+                self._template_cache.popitem(last=False)
+        
+        return [TextContent(type="text", text=result)]
     
+    @tool_handler
     async def handle_add_document_type(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """Add a new document type"""
-        try:
-            doc_type = arguments["doc_type"]
-            description = arguments["description"]
-            template = arguments["template"]
-            
-            success = self.generator.add_document_type(doc_type, description, template)
-            
-            if success:
-                return [TextContent(type="text", text=f"Successfully added document type: {doc_type}")]
-            else:
-                return [TextContent(type="text", text=f"Failed to add document type: {doc_type}")]
-                
-        except Exception as e:
-            logger.error(f"Error adding document type: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+        doc_type = arguments["doc_type"]
+        description = arguments["description"]
+        template = arguments["template"]
+        
+        success = self.generator.add_document_type(doc_type, description, template)
+        
+        if success:
+            self._types_cache = (None, 0.0)
+            self._template_cache.clear()
+            return [TextContent(type="text", text=f"Successfully added document type: {doc_type}")]
+        else:
+            return [TextContent(type="text", text=f"Failed to add document type: {doc_type}")]
 
+    @tool_handler
     async def handle_transform_text(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """Transform arbitrary text using a provided prompt and AI client."""
-        try:
-            text = arguments.get("text", "")
-            prompt = arguments.get("prompt", "")
-            ai_provider = arguments.get("ai_provider", self.config.default_ai_provider)
-            model = arguments.get("model", self.config.default_model)
-            max_tokens = arguments.get("max_tokens", self.config.default_max_tokens)
-            temperature = arguments.get("temperature", self.config.default_temperature)
-
-            if "{content}" in prompt:
-                final_prompt = prompt.format(content=text)
-            else:
-                # If prompt doesn't include placeholder, append the text to the prompt
-                final_prompt = f"{prompt}\n\n{text}"
+        text = arguments.get("text", "")
+        prompt = arguments.get("prompt", "")
+        params = self._parse_llm_params(arguments)
 
-            # Call AI client
+        # Keep the instructions ahead of the text so repeated calls share a
+        # cacheable prompt prefix
+        final_prompt = None
+        if "{content}" in prompt:
+            try:
+                final_prompt = prompt.format_map({"content": text})
+                cache_prefix = _prompt_prefix(prompt)
+            except (KeyError, IndexError, ValueError):
+                # Other braces in the prompt aren't placeholders we can fill
+                final_prompt = None
+        if final_prompt is None:
+            # If prompt doesn't include placeholder, append the text to the prompt
+            cache_prefix = f"{prompt}\n\n"
+            final_prompt = cache_prefix + text
+
+        # Similar texts only share a semantically cached response under the same instructions
+        semantic_key = (prompt, text)
+
+        # Stream only when the client listens for progress notifications
+        send_progress = _progress_sender.get()
+        if send_progress is None:
             result_text = await self.generator.ai_client.generate_text(
                 prompt=final_prompt,
-                provider=ai_provider,
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature
+                provider=params.provider,
+                model=params.model,
+                max_tokens=params.max_tokens,
+                temperature=params.temperature,
+                cache_prefix=cache_prefix,
+                semantic_key=semantic_key
             )
+        else:
+            parts = []
+            received = 0
+            async for chunk in self.generator.ai_client.stream_text(
+                prompt=final_prompt,
+                provider=params.provider,
+                model=params.model,
+                max_tokens=params.max_tokens,
+                temperature=params.temperature,
+                cache_prefix=cache_prefix,
+                semantic_key=semantic_key
+            ):
+                parts.append(chunk)
+                received += len(chunk)
+                await send_progress(received, chunk)
+            result_text = "".join(parts)
 
-            return [TextContent(type="text", text=result_text)]
-
-        except Exception as e:
-            logger.error(f"Error transforming text: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+        return [TextContent(type="text", text=result_text)]
     
+    @tool_handler
     async def handle_list_generated_documents(self, arguments: Dict[str, Any]) -> List[TextContent]:
         """List generated documents"""
-        try:
-            doc_type_filter = arguments.get("doc_type", "")
-            documents = self.generator.list_generated_documents(doc_type_filter)
-            
-            if not documents:
-                return [TextContent(type="text", text="No generated documents found.")]
-            
-            result = "# Generated Documents\n\n"
-            for doc in documents:
-                result += f"- **{doc['title']}** ({doc['doc_type']}) - {doc['created_at']}\n"
-                result += f"  ID: `{doc['id']}`\n\n"
-            
-            return [TextContent(type="text", text=result)]
-            
-        except Exception as e:
-            logger.error(f"Error listing documents: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+        doc_type_filter = arguments.get("doc_type", "")
+        documents = self.generator.list_generated_documents(doc_type_filter)
+        
+        if not documents:
+            return [TextContent(type="text", text="No generated documents found.")]
+        
+        parts = ["# Generated Documents\n\n"]
+        for doc in documents:
+            parts.append(
+                f"- **{doc['title']}** ({doc['doc_type']}) - {doc['created_at']}\n"
+                f"  ID: `{doc['id']}`\n\n"
+            )
+        
+        return [TextContent(type="text", text="".join(parts))]
     
-    async def handle_get_generated_document(self, arguments: Dict[str, Any]) -> List[TextContent]:
+    @tool_handler
+    async def handle_get_generated_document(self, arguments: Dict[str, Any]) -> List[Union[TextContent, ResourceLink]]:
         """Get a generated document"""
-        try:
-            document_id = arguments["document_id"]
-            document = self.generator.get_generated_document(document_id)
-            
-            if document:
-                return [TextContent(type="text", text=document["content"])]
-            else:
+        document_id = arguments["document_id"]
+        
+        # A link keeps large documents out of the response (and the caller's context)
+        if arguments.get("return_handle", False):
+            path = self.generator.get_generated_document_path(document_id)
+            if path is None:
                 return [TextContent(type="text", text=f"Document not found: {document_id}")]
-                
-        except Exception as e:
-            logger.error(f"Error getting document: {e}")
-            return [TextContent(type="text", text=f"Error: {str(e)}")]
+            return [ResourceLink(
+                type="resource_link",
+                name=path.name,
+                uri=path.resolve().as_uri(),
+                mimeType="text/markdown",
+                size=path.stat().st_size,
+                _meta={"cache_hint": "no-cache"}
+            )]
+        
+        document = self.generator.get_generated_document(document_id)
+        
+        if document:
+            return [TextContent(type="text", text=document["content"])]
+        else:
+            return [TextContent(type="text", text=f"Document not found: {document_id}")]
 
 
 class CustomServer(Server):
@@ -335,37 +551,34 @@ class CustomServer(Server):
             "version": "1.0.0"
         }
 
-def create_server() -> Server:
+def create_server(doc_server: Optional[DocumentationGeneratorServer] = None) -> Server:
     """Create and configure the MCP server"""
     server = Server("documentation-generator")
-    doc_server = DocumentationGeneratorServer()
+    if doc_server is None:
+        doc_server = DocumentationGeneratorServer()
     
-    # Register tools
-    tools = doc_server.get_available_tools()
-    for tool in tools:
-        @server.call_tool()
-        async def handle_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-            if name == "list_document_types":
-                return await doc_server.handle_list_document_types(arguments)
-            elif name == "generate_documentation":
-                return await doc_server.handle_generate_documentation(arguments)
-            elif name == "get_document_template":
-                return await doc_server.handle_get_document_template(arguments)
-            elif name == "add_document_type":
-                return await doc_server.handle_add_document_type(arguments)
-            elif name == "transform_text":
-                return await doc_server.handle_transform_text(arguments)
-            elif name == "list_generated_documents":
-                return await doc_server.handle_list_generated_documents(arguments)
-            elif name == "get_generated_document":
-                return await doc_server.handle_get_generated_document(arguments)
-            else:
-                return [TextContent(type="text", text=f"Unknown tool: {name}")]
+    # Register the tool dispatcher
+    @server.call_tool()
+    async def handle_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+        handler = doc_server._dispatch.get(name)
+        if handler is None:
+            return [TextContent(type="text", text=f"Unknown tool: {name}")]
+        
+        # Let long-running handlers stream their output as progress notifications
+        ctx = server.request_context
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        if progress_token is not None:
+            _progress_sender.set(
+                lambda progress, message: ctx.session.send_progress_notification(
+                    progress_token, progress, message=message
+                )
+            )
+        return await handler(arguments)
     
     # Register list_tools handler
     @server.list_tools()
     async def list_tools() -> List[Tool]:
-        return tools
+        return doc_server._tools
     
     return server
 
@@ -377,42 +590,47 @@ async def main():
     """Main entry point"""
     logger.info("Starting Documentation Generator MCP Server...")
     
+    # SIGHUP re-reads the host name reported in logs
+    if hasattr(signal, 'SIGHUP'):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, refresh_hostname)
+    
     # Debug: Print environment variables
-    import os
-    logger.info("Environment variables:")
-    for key, value in sorted(os.environ.items()):
-        logger.info(f"  {key}={value}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Environment variables:")
+        for key, value in sorted(os.environ.items()):
+            logger.debug("  %s=%s", key, _redact(key, value))
     
     # Initialize server
-    server = create_server()
+    doc_server = DocumentationGeneratorServer()
+    server = create_server(doc_server)
     
     # Run server with stdio transport
     async with stdio_server() as (read_stream, write_stream):
         # Debug: Print initialization options
         init_options = server.create_initialization_options()
-        logger.info(f"Initialization options type: {type(init_options)}")
+        logger.info("Initialization options type: %s", type(init_options))
         
-        if hasattr(init_options, '__dict__'):
-            logger.info("Initialization options attributes:")
+        if logger.isEnabledFor(logging.DEBUG) and hasattr(init_options, '__dict__'):
+            logger.debug("Initialization options attributes:")
             for key, value in init_options.__dict__.items():
-                logger.info(f"  {key}={value}")
+                logger.debug("  %s=%s", key, _redact(key, value))
         
         # Debug: Print initialization options as JSON
         try:
-            if hasattr(init_options, '__dict__'):
+            if logger.isEnabledFor(logging.DEBUG) and hasattr(init_options, '__dict__'):
                 # Convert to dict and then to JSON
                 init_dict = {}
                 for key, value in init_options.__dict__.items():
                     # Skip complex objects that might not be JSON serializable
                     if isinstance(value, (str, int, float, bool, type(None))):
-                        init_dict[key] = value
+                        init_dict[key] = _redact(key, value)
                     else:
-                        init_dict[key] = str(value)
+                        init_dict[key] = _redact(key, str(value))
                 
                 json_str = json.dumps(init_dict)
-                logger.info(f"Initialization options JSON (simplified): {json_str}")
+                logger.debug("Initialization options JSON (simplified): %s", json_str)
         except Exception as e:
-            logger.error(f"Error converting initialization options to JSON: {e}")
+            logger.error("Error converting initialization options to JSON: %s", e)
         
         # Use the original initialization options but catch and log any errors
         try:
@@ -420,13 +638,21 @@ async def main():
             logger.info("Running server with stdio transport...")
             await server.run(read_stream, write_stream, init_options)
         except Exception as e:
-            logger.error(f"Error during initialization: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Error during initialization: %s", e)
             # Fall back to original behavior
             logger.info("Falling back to original behavior...")
             await server.run(read_stream, write_stream, server.create_initialization_options())
+        finally:
+            if doc_server._generator is not None:
+                await doc_server._generator.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop's event loop cuts per-await overhead; fall back to asyncio's where
+    # it isn't installed (e.g. Windows)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
\ No newline at end of file
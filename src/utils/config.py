@@ -1,75 +1,186 @@
 """Configuration management for Documentation Generator"""
 
 import os
-from typing import Dict, Any
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Writable directory chosen for each (primary, fallback) pair, so the
+# write probe runs once per process
+_DIR_CACHE: Dict[Tuple[str, str], str] = {}
 
+def _env_flag(name: str, default: str = 'false') -> bool:
+    """Read a true/false environment variable"""
+    return os.getenv(name, default).lower() == 'true'
+
+@lru_cache(maxsize=1)
+def _load_dotenv():
+    """Load environment variables from .env, once"""
+    load_dotenv()
+
+def _setup_directory(primary_path: str, fallback_path: str) -> str:
+    """Setup directory with fallback if permissions fail"""
+    key = (primary_path, fallback_path)
+    if key not in _DIR_CACHE:
+        _DIR_CACHE[key] = _probe_directory(primary_path, fallback_path)
+    return _DIR_CACHE[key]
+
+def _probe_directory(primary_path: str, fallback_path: str) -> str:
+    """Create and return the first writable directory of the primary and fallback paths"""
+    try:
+        os.makedirs(primary_path, exist_ok=True)
+        # Test write permissions
+        test_file = os.path.join(primary_path, '.write_test')
+        with open(test_file, 'w') as f:
+            f.write('test')
+        os.unlink(test_file)
+        return primary_path
+    except (PermissionError, OSError) as e:
+        # Fall back to temp directory
+        try:
+            os.makedirs(fallback_path, exist_ok=True)
+            # Test write permissions for fallback
+            test_file = os.path.join(fallback_path, '.write_test')
+            with open(test_file, 'w') as f:
+                f.write('test')
+            os.unlink(test_file)
+            return fallback_path
+        except (PermissionError, OSError) as e2:
+            # Last resort: use current directory
+            current_dir = os.getcwd()
+            return current_dir
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration class for the Documentation Generator"""
-    
-    def __init__(self):
-        self.log_level = os.getenv('LOG_LEVEL', 'INFO')
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
-        self.openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
-        self.default_ai_provider = os.getenv('DEFAULT_AI_PROVIDER', 'openai')
-        self.default_model = os.getenv('DEFAULT_MODEL', 'gpt-4o-mini')
-        self.default_max_tokens = int(os.getenv('DEFAULT_MAX_TOKENS', '4000'))
-        self.default_temperature = float(os.getenv('DEFAULT_TEMPERATURE', '0.3'))
-        
-        # Grafana Loki configuration
-        self.loki_enabled = os.getenv('LOKI_ENABLED', 'false').lower() == 'true'
-        self.loki_host = os.getenv('LOKI_HOST', 'localhost')
-        self.loki_port = int(os.getenv('LOKI_PORT', '3100'))
-        self.loki_username = os.getenv('LOKI_USERNAME', '')
-        self.loki_password = os.getenv('LOKI_PASSWORD', '')
-        self.loki_tenant = os.getenv('LOKI_TENANT', '')
-        
-        # Prometheus metrics configuration
-        self.prometheus_enabled = os.getenv('PROMETHEUS_ENABLED', 'false').lower() == 'true'
-        self.prometheus_port = int(os.getenv('PROMETHEUS_PORT', '9090'))
-        self.prometheus_path = os.getenv('PROMETHEUS_PATH', '/metrics')
-        
-        # Syslog configuration (alternative to Splunk HEC)
-        self.syslog_enabled = os.getenv('SYSLOG_ENABLED', 'false').lower() == 'true'
-        self.syslog_host = os.getenv('SYSLOG_HOST', 'localhost')
-        self.syslog_port = int(os.getenv('SYSLOG_PORT', '514'))
-        self.syslog_facility = os.getenv('SYSLOG_FACILITY', 'local0')
+    """Configuration class for the Documentation Generator
+    
+    Build it from the environment with ``Config.from_env()``, or share the
+    process-wide instance returned by ``get_config()``.
+    """
+    
+    log_level: str
+    openai_api_key: Optional[str]
+    anthropic_api_key: Optional[str]
+    openrouter_api_key: Optional[str]
+    default_ai_provider: str
+    default_model: str
+    default_max_tokens: int
+    default_temperature: float
+    
+    # AI provider concurrency caps and rate limits (requests per minute, 0 disables)
+    openai_concurrency: int
+    openai_rpm: int
+    anthropic_concurrency: int
+    anthropic_rpm: int
+    openrouter_concurrency: int
+    openrouter_rpm: int
+    ai_max_retries: int
+    
+    # Race these providers against each other in generate_text_race (multiplies token spend)
+    ai_race_enabled: bool
+    ai_race_providers: Tuple[str, ...]
+    
+    # Documents generated at once by the generate_documentation_batch tool
+    max_concurrent_llm_calls: int
+    
+    # Number of temperature 0 responses kept in memory for reuse (0 disables)
+    ai_cache_size: int
+    
+    # Seconds list_document_types and get_document_template responses are reused
+    discovery_cache_ttl: int
+    
+    # Reuse of responses to similar prompts, matched by embedding cosine similarity (needs numpy)
+    semantic_cache_enabled: bool
+    semantic_cache_threshold: float
+    semantic_cache_size: int
+    semantic_cache_max_temperature: float
+    embedding_model: str
+    
+    # Seconds between status polls for provider Batch API jobs
+    batch_poll_interval: float
+    
+    # Grafana Loki configuration
+    loki_enabled: bool
+    loki_host: str
+    loki_port: int
+    loki_username: str
+    loki_password: str
+    loki_tenant: str
+    
+    # Prometheus metrics configuration
+    prometheus_enabled: bool
+    prometheus_port: int
+    prometheus_path: str
+    
+    # Syslog configuration (alternative to Splunk HEC)
+    syslog_enabled: bool
+    syslog_host: str
+    syslog_port: int
+    syslog_facility: str
+    syslog_protocol: str
+    
+    # Writable directories (with fallbacks)
+    output_dir: str
+    templates_dir: str
+    
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Parse the configuration from environment variables (and .env)"""
+        _load_dotenv()
         
         # Paths with fallbacks
         fallback_output = os.getenv('FALLBACK_OUTPUT_DIR', '/tmp/documentation-output')
         fallback_templates = os.getenv('FALLBACK_TEMPLATES_DIR', '/tmp/documentation-templates')
         
-        self.output_dir = self._setup_directory('/app/data/output', fallback_output)
-        self.templates_dir = self._setup_directory('/app/data/templates', fallback_templates)
-    
-    def _setup_directory(self, primary_path: str, fallback_path: str) -> str:
-        """Setup directory with fallback if permissions fail"""
-        try:
-            os.makedirs(primary_path, exist_ok=True)
-            # Test write permissions
-            test_file = os.path.join(primary_path, '.write_test')
-            with open(test_file, 'w') as f:
-                f.write('test')
-            os.unlink(test_file)
-            return primary_path
-        except (PermissionError, OSError) as e:
-            # Fall back to temp directory
-            try:
-                os.makedirs(fallback_path, exist_ok=True)
-                # Test write permissions for fallback
-                test_file = os.path.join(fallback_path, '.write_test')
-                with open(test_file, 'w') as f:
-                    f.write('test')
-                os.unlink(test_file)
-                return fallback_path
-            except (PermissionError, OSError) as e2:
-                # Last resort: use current directory
-                current_dir = os.getcwd()
-                return current_dir
+        return cls(
+            log_level=os.getenv('LOG_LEVEL', 'INFO'),
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            anthropic_api_key=os.getenv('ANTHROPIC_API_KEY'),
+            openrouter_api_key=os.getenv('OPENROUTER_API_KEY'),
+            default_ai_provider=os.getenv('DEFAULT_AI_PROVIDER', 'openai').lower(),
+            default_model=os.getenv('DEFAULT_MODEL', 'gpt-4o-mini'),
+            default_max_tokens=int(os.getenv('DEFAULT_MAX_TOKENS', '4000')),
+            default_temperature=float(os.getenv('DEFAULT_TEMPERATURE', '0.3')),
+            openai_concurrency=int(os.getenv('OPENAI_CONCURRENCY', '8')),
+            openai_rpm=int(os.getenv('OPENAI_RPM', '500')),
+            anthropic_concurrency=int(os.getenv('ANTHROPIC_CONCURRENCY', '4')),
+            anthropic_rpm=int(os.getenv('ANTHROPIC_RPM', '50')),
+            openrouter_concurrency=int(os.getenv('OPENROUTER_CONCURRENCY', '8')),
+            openrouter_rpm=int(os.getenv('OPENROUTER_RPM', '200')),
+            ai_max_retries=int(os.getenv('AI_MAX_RETRIES', '3')),
+            ai_race_enabled=_env_flag('AI_RACE_ENABLED'),
+            ai_race_providers=tuple(
+                provider.strip().lower()
+                for provider in os.getenv('AI_RACE_PROVIDERS', 'openai,anthropic').split(',')
+                if provider.strip()
+            ),
+            max_concurrent_llm_calls=int(os.getenv('MAX_CONCURRENT_LLM_CALLS', '8')),
+            ai_cache_size=int(os.getenv('AI_CACHE_SIZE', '256')),
+            discovery_cache_ttl=int(os.getenv('DISCOVERY_CACHE_TTL', '300')),
+            semantic_cache_enabled=_env_flag('SEMANTIC_CACHE_ENABLED'),
+            semantic_cache_threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92')),
+            semantic_cache_size=int(os.getenv('SEMANTIC_CACHE_SIZE', '1024')),
+            semantic_cache_max_temperature=float(os.getenv('SEMANTIC_CACHE_MAX_TEMPERATURE', '0.3')),
+            embedding_model=os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small'),
+            batch_poll_interval=float(os.getenv('BATCH_POLL_INTERVAL', '30')),
+            loki_enabled=_env_flag('LOKI_ENABLED'),
+            loki_host=os.getenv('LOKI_HOST', 'localhost'),
+            loki_port=int(os.getenv('LOKI_PORT', '3100')),
+            loki_username=os.getenv('LOKI_USERNAME', ''),
+            loki_password=os.getenv('LOKI_PASSWORD', ''),
+            loki_tenant=os.getenv('LOKI_TENANT', ''),
+            prometheus_enabled=_env_flag('PROMETHEUS_ENABLED'),
+            prometheus_port=int(os.getenv('PROMETHEUS_PORT', '9090')),
+            prometheus_path=os.getenv('PROMETHEUS_PATH', '/metrics'),
+            syslog_enabled=_env_flag('SYSLOG_ENABLED'),
+            syslog_host=os.getenv('SYSLOG_HOST', 'localhost'),
+            syslog_port=int(os.getenv('SYSLOG_PORT', '514')),
+            syslog_facility=os.getenv('SYSLOG_FACILITY', 'local0'),
+            syslog_protocol=os.getenv('SYSLOG_PROTOCOL', 'udp').lower(),
+            output_dir=_setup_directory('/app/data/output', fallback_output),
+            templates_dir=_setup_directory('/app/data/templates', fallback_templates),
+        )
     
     def get_ai_config(self, provider: str) -> Dict[str, Any]:
         """Get AI provider configuration"""
@@ -97,4 +208,9 @@ class Config:
             config = self.get_ai_config(provider)
             return config['api_key'] is not None
         except ValueError:
-            return False
\ No newline at end of file
+            return False
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Process-wide configuration, parsed from the environment on first use"""
+    return Config.from_env()
@@ -1,20 +1,92 @@
 """Logging configuration for Documentation Generator with Splunk support"""
 
+import gzip
+import json
 import logging
 import logging.handlers
-import json
+import math
 import os
 import socket
 import sys
-from datetime import datetime
-from typing import Optional, Dict, Any, List
-import requests
+from collections import deque
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
 import threading
 import time
 
+# Host name reported with every record, looked up once (see refresh_hostname)
+_HOSTNAME = socket.gethostname()
+
+def refresh_hostname():
+    """Look the host name up again, e.g. after the container is renamed"""
+    global _HOSTNAME
+    _HOSTNAME = socket.gethostname()
+
+@lru_cache(maxsize=1)
+def _iso_seconds(seconds: int) -> str:
+    """UTC ISO 8601 date and time of a whole second"""
+    s = time.gmtime(seconds)
+    return f"{s.tm_year:04d}-{s.tm_mon:02d}-{s.tm_mday:02d}T{s.tm_hour:02d}:{s.tm_min:02d}:{s.tm_sec:02d}"
+
+def _iso(ts: float) -> str:
+    """UTC ISO 8601 timestamp with microseconds, formatting the date part once per second"""
+    # Microseconds rounded like datetime.fromtimestamp
+    fraction, seconds = math.modf(ts)
+    micros = round(fraction * 1_000_000)
+    if micros >= 1_000_000:
+        seconds += 1
+        micros -= 1_000_000
+    return f"{_iso_seconds(int(seconds))}.{micros:06d}Z"
+
+# Syslog facility names accepted in SYSLOG_FACILITY
+_FACILITY_MAP = {
+    name: getattr(logging.handlers.SysLogHandler, f'LOG_{name.upper()}')
+    for name in (
+        'local0', 'local1', 'local2', 'local3', 'local4', 'local5', 'local6', 'local7',
+        'user', 'daemon', 'mail', 'auth', 'authpriv', 'syslog', 'kern', 'lpr', 'news',
+        'uucp', 'cron', 'ftp'
+    )
+}
+
+def _json_dumps(obj) -> bytes:
+    """Serialize a log object to JSON, falling back to json for what orjson rejects
+    
+    orjson refuses lone surrogates, e.g. from paths or arguments decoded with
+    surrogateescape; json escapes them and stringifies anything unserializable.
+    """
+    # Imported on first use, so only processes that log JSON load orjson
+    import orjson
+    try:
+        return orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        return json.dumps(obj, default=str).encode()
+
+# Formats exception tracebacks for handlers that have no formatter of their own
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+def _record_fields(record: logging.LogRecord) -> Tuple[str, Optional[str], str]:
+    """Message, exception text and timestamp of a record, computed once and shared by all handlers"""
+    try:
+        return record._cached_fields
+    except AttributeError:
+        pass
+    
+    # exc_text is the stdlib Formatter's own cache, so the console formatter reuses it too
+    if record.exc_info and not record.exc_text:
+        record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+    fields = (record.getMessage(), record.exc_text or None, _iso(record.created))
+    record._cached_fields = fields
+    return fields
+
 class LokiHandler(logging.Handler):
     """Custom handler for sending logs to Grafana Loki"""
     
+    # Entries that trigger an early push, seconds between pushes, and entries
+    # held before the oldest are dropped while Loki can't keep up
+    BATCH_SIZE = 10
+    FLUSH_INTERVAL = 5.0
+    QUEUE_SIZE = 10000
+    
     def __init__(self, host: str, port: int, username: str = '', password: str = '', tenant: str = ''):
         super().__init__()
         self.host = host
@@ -24,43 +96,48 @@ class LokiHandler(logging.Handler):
         self.tenant = tenant
         self.url = f"http://{host}:{port}/loki/api/v1/push"
         
-        # Setup headers
-        self.headers = {'Content-Type': 'application/json'}
+        # Setup headers; pushes are gzip-compressed JSON
+        self.headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
         if tenant:
             self.headers['X-Scope-OrgID'] = tenant
             
-        # Setup session with auth if provided
-        self.session = requests.Session()
-        if username and password:
-            self.session.auth = (username, password)
+        # Labels shared by every stream this process pushes
+        self._base_labels = {'job': 'documentation-generator', 'hostname': _HOSTNAME}
+        
+        # Keep-alive client reused for every push, with auth if provided. httpx is
+        # only imported when Loki logging is enabled
+        import httpx
+        self.session = httpx.Client(
+            auth=(username, password) if username and password else None,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            timeout=5.0
+        )
         
-        # Buffer for batching logs
-        self.log_buffer = []
-        self.buffer_lock = threading.Lock()
-        self.last_flush = time.time()
+        # A single worker thread batches buffered entries and pushes them in order.
+        # deque appends and pops are atomic, so logging threads never take a lock
+        self._buffer: "deque[Tuple[Tuple[str, ...], str, str]]" = deque(maxlen=self.QUEUE_SIZE)
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._worker = threading.Thread(target=self._worker_loop, name="loki-handler", daemon=True)
+        self._worker.start()
         
     def emit(self, record):
-        """Buffer log record for Loki"""
+        """Queue log record for Loki"""
         try:
             # Create Loki log entry
             timestamp_ns = str(int(record.created * 1_000_000_000))  # Convert to nanoseconds
             
-            # Create labels for Loki
-            labels = {
-                'job': 'documentation-generator',
-                'level': record.levelname.lower(),
-                'logger': record.name,
-                'module': record.module,
-                'function': record.funcName,
-                'hostname': socket.gethostname()
-            }
+            # Labels that vary per record; _base_labels are added per stream at flush
+            stream_key = (record.levelname.lower(), record.name, record.module, record.funcName)
+            
+            message, exception, timestamp = _record_fields(record)
             
             # Create log line (JSON format)
             log_line = {
-                'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+                'timestamp': timestamp,
                 'level': record.levelname,
                 'logger': record.name,
-                'message': record.getMessage(),
+                'message': message,
                 'module': record.module,
                 'function': record.funcName,
                 'line': record.lineno,
@@ -69,100 +146,303 @@ class LokiHandler(logging.Handler):
             }
             
             # Add exception info if present
-            if record.exc_info:
-                log_line['exception'] = self.formatException(record.exc_info)
-            
-            # Buffer the log entry
-            with self.buffer_lock:
-                self.log_buffer.append({
-                    'timestamp': timestamp_ns,
-                    'labels': labels,
-                    'line': json.dumps(log_line)
-                })
-                
-                # Flush buffer if it's getting full or enough time has passed
-                if len(self.log_buffer) >= 10 or (time.time() - self.last_flush) > 5:
-                    self._flush_buffer()
+            if exception:
+                log_line['exception'] = exception
+            
+            self._buffer.append((stream_key, timestamp_ns, _json_dumps(log_line).decode()))
+            if len(self._buffer) >= self.BATCH_SIZE:
+                self._wakeup.set()
             
         except Exception as e:
             # Fallback to stderr if Loki fails
             print(f"Failed to buffer log for Loki: {e}", file=sys.stderr)
     
-    def _flush_buffer(self):
-        """Flush buffered logs to Loki (runs in separate thread)"""
-        if not self.log_buffer:
-            return
-            
-        buffer_copy = self.log_buffer.copy()
-        self.log_buffer.clear()
-        self.last_flush = time.time()
-        
-        # Send in background thread
-        threading.Thread(
-            target=self._send_to_loki,
-            args=(buffer_copy,),
-            daemon=True
-        ).start()
-    
-    def _send_to_loki(self, log_entries: List[Dict[str, Any]]):
-        """Send log entries to Loki (runs in separate thread)"""
+    def _worker_loop(self):
+        """Push buffered entries to Loki until the handler is closed (runs in the worker thread)"""
+        while not self._closing:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._send_pending()
+        self._send_pending()
+    
+    def _send_pending(self):
+        """Send everything buffered so far"""
+        entries = []
+        while self._buffer:
+            entries.append(self._buffer.popleft())
+        if entries:
+            self._send_to_loki(entries)
+    
+    def _send_to_loki(self, log_entries: List[Tuple[Tuple[str, ...], str, str]]):
+        """Send log entries to Loki (runs in the worker thread)"""
         try:
-            # Group logs by labels
-            streams = {}
-            for entry in log_entries:
-                label_str = json.dumps(entry['labels'], sort_keys=True)
-                if label_str not in streams:
-                    streams[label_str] = {
-                        'stream': entry['labels'],
-                        'values': []
-                    }
-                streams[label_str]['values'].append([entry['timestamp'], entry['line']])
+            if self._base_labels['hostname'] != _HOSTNAME:
+                self._base_labels = {**self._base_labels, 'hostname': _HOSTNAME}
+            
+            # Group logs by their label tuple, building each label dict once per stream
+            values_by_stream: Dict[Tuple[str, ...], List[List[str]]] = {}
+            for stream_key, timestamp_ns, line in log_entries:
+                values = values_by_stream.get(stream_key)
+                if values is None:
+                    values = values_by_stream[stream_key] = []
+                values.append([timestamp_ns, line])
+            
+            streams = [
+                {
+                    'stream': {
+                        **self._base_labels,
+                        'level': level,
+                        'logger': logger_name,
+                        'module': module,
+                        'function': function
+                    },
+                    'values': values
+                }
+                for (level, logger_name, module, function), values in values_by_stream.items()
+            ]
             
             # Create Loki payload
             payload = {
-                'streams': list(streams.values())
+                'streams': streams
             }
             
             response = self.session.post(
                 self.url,
                 headers=self.headers,
-                data=json.dumps(payload),
-                timeout=5
+                # Level 1 is cheap and still shrinks repetitive log JSON several times over
+                content=gzip.compress(_json_dumps(payload), compresslevel=1)
             )
             
             if response.status_code not in [200, 204]:
-                print(f"Loki HTTP error: {response.status_code} - {response.text}")
+                print(f"Loki HTTP error: {response.status_code} - {response.text}", file=sys.stderr)
                 
         except Exception as e:
-            print(f"Failed to send to Loki: {e}")
+            # stderr, as stdout carries the MCP protocol
+            print(f"Failed to send to Loki: {e}", file=sys.stderr)
     
     def close(self):
-        """Flush remaining logs when handler is closed"""
-        with self.buffer_lock:
-            self._flush_buffer()
+        """Send remaining logs and stop the worker when handler is closed"""
+        if self._worker.is_alive():
+            self._closing = True
+            self._wakeup.set()
+            self._worker.join(timeout=self.FLUSH_INTERVAL)
+        self.session.close()
+        super().close()
+
+class BatchingSysLogHandler(logging.handlers.SysLogHandler):
+    """SysLogHandler that sends records from a background thread in batches
+    
+    Over TCP a batch goes out in a single send, with RFC 6587 octet-counted
+    framing. A UDP datagram must hold exactly one message, so over UDP records
+    are sent one per send() on a connected socket.
+    """
+    
+    # Records per batch, seconds between sends of a partial batch, and records
+    # held before the oldest are dropped while the receiver can't keep up
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 0.2
+    QUEUE_SIZE = 10000
+    
+    def __init__(self, address, facility, socktype=None):
+        super().__init__(address=address, facility=facility, socktype=socktype)
+        self._stream = self.socktype == socket.SOCK_STREAM
+        if self._stream:
+            # Octet counting delimits messages, so no trailing NUL
+            self.append_nul = False
+        elif not self.unixsocket:
+            # Connected once, so sends skip the per-datagram route lookup
+            self.socket.connect(address)
+        
+        self._buffer: "deque[bytes]" = deque(maxlen=self.QUEUE_SIZE)
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._worker = threading.Thread(target=self._worker_loop, name="syslog-handler", daemon=True)
+        self._worker.start()
+    
+    def emit(self, record):
+        """Queue a formatted syslog message for the worker"""
+        try:
+            msg = self.format(record)
+            if self.ident:
+                msg = self.ident + msg
+            if self.append_nul:
+                msg += '\000'
+            prio = '<%d>' % self.encodePriority(self.facility, self.mapPriority(record.levelname))
+            message = (prio + msg).encode('utf-8')
+            if self._stream:
+                message = b'%d %b' % (len(message), message)
+            
+            self._buffer.append(message)
+            if len(self._buffer) >= self.BATCH_SIZE:
+                self._wakeup.set()
+        except Exception:
+            self.handleError(record)
+    
+    def _worker_loop(self):
+        """Send queued messages until the handler is closed (runs in the worker thread)"""
+        while not self._closing:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._send_pending()
+        self._send_pending()
+    
+    def _send_pending(self):
+        """Send everything queued so far"""
+        messages = []
+        while self._buffer:
+            messages.append(self._buffer.popleft())
+        if not messages:
+            return
+        
+        try:
+            if self._stream:
+                self.socket.sendall(b''.join(messages))
+            else:
+                for message in messages:
+                    self.socket.send(message)
+        except OSError as e:
+            print(f"Failed to send to syslog: {e}", file=sys.stderr)
+    
+    def close(self):
+        """Send remaining messages and stop the worker when handler is closed"""
+        if self._worker.is_alive():
+            self._closing = True
+            self._wakeup.set()
+            self._worker.join(timeout=self.FLUSH_INTERVAL * 5)
+        super().close()
+
+class BatchingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that writes records from a background thread in batches
+    
+    emit() only formats and queues the record, so logging threads never block
+    on disk I/O; the worker writes each batch with a single write() and flush.
+    Writes are serialized by their own lock rather than the handler lock, which
+    logging.shutdown() holds while it flushes and closes the handler.
+    """
+    
+    # Records per batch, seconds between writes of a partial batch, and records
+    # held before the oldest are dropped while the disk can't keep up
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 0.2
+    QUEUE_SIZE = 10000
+    
+    def __init__(self, filename, maxBytes=0, backupCount=0):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount)
+        self._buffer: "deque[str]" = deque(maxlen=self.QUEUE_SIZE)
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._write_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._worker_loop, name="file-handler", daemon=True)
+        self._worker.start()
+    
+    def emit(self, record):
+        """Queue a formatted record for the worker"""
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+            if len(self._buffer) >= self.BATCH_SIZE:
+                self._wakeup.set()
+        except Exception:
+            self.handleError(record)
+    
+    def _worker_loop(self):
+        """Write queued records until the handler is closed (runs in the worker thread)"""
+        while not self._closing:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self._write_pending()
+    
+    def _write_pending(self):
+        """Write everything queued so far, rolling the file over whenever it would grow too large"""
+        with self._write_lock:
+            lines = []
+            while self._buffer:
+                lines.append(self._buffer.popleft())
+            if not lines:
+                return
+            
+            try:
+                if self.stream is None:
+                    if self._closing:
+                        # Closed; don't reopen a stream nothing would close
+                        return
+                    self.stream = self._open()
+                if self.maxBytes <= 0:
+                    self.stream.write(''.join(lines))
+                else:
+                    # One write per file, split where a rollover is due
+                    self.stream.seek(0, 2)
+                    position = self.stream.tell()
+                    chunk = []
+                    for line in lines:
+                        if position and position + len(line) >= self.maxBytes:
+                            self.stream.write(''.join(chunk))
+                            chunk = []
+                            self.doRollover()
+                            position = 0
+                        chunk.append(line)
+                        position += len(line)
+                    self.stream.write(''.join(chunk))
+                self.stream.flush()
+            except OSError as e:
+                print(f"Failed to write log file: {e}", file=sys.stderr)
+    
+    def flush(self):
+        """Write queued records now, on the calling thread"""
+        self._write_pending()
+    
+    def close(self):
+        """Stop the worker and write remaining records when handler is closed"""
+        if self._worker.is_alive():
+            self._closing = True
+            self._wakeup.set()
+            self._worker.join(timeout=self.FLUSH_INTERVAL * 5)
+        # Written here, before the stream is closed, rather than by the worker
+        self._write_pending()
         super().close()
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging"""
     
     def format(self, record):
+        message, exception, timestamp = _record_fields(record)
         log_obj = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': timestamp,
             'level': record.levelname,
             'logger': record.name,
-            'message': record.getMessage(),
+            'message': message,
             'module': record.module,
             'function': record.funcName,
             'line': record.lineno,
             'thread': record.thread,
             'process': record.process,
-            'hostname': socket.gethostname()
+            'hostname': _HOSTNAME
         }
         
-        if record.exc_info:
-            log_obj['exception'] = self.formatException(record.exc_info)
+        if exception:
+            log_obj['exception'] = exception
             
-        return json.dumps(log_obj)
+        return _json_dumps(log_obj).decode()
+
+# Formatters hold no per-handler state, so every logger's handlers share these
+_CONSOLE_FMT = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_JSON_FMT = JSONFormatter()
+
+# File handler shared by every logger, so a single worker thread writes the log
+# file and a rollover is seen by all loggers; created by the first setup_logger call
+_file_handler: Optional[BatchingRotatingFileHandler] = None
+
+def _get_file_handler() -> BatchingRotatingFileHandler:
+    """Get the shared file handler, creating it on first use"""
+    global _file_handler
+    if _file_handler is None:
+        os.makedirs('/app/logs', exist_ok=True)
+        _file_handler = BatchingRotatingFileHandler(
+            '/app/logs/documentation-generator.log',
+            maxBytes=10*1024*1024,  # 10MB
+            backupCount=5
+        )
+        _file_handler.setFormatter(_JSON_FMT)
+    return _file_handler
 
 def setup_logger(name: str, level: Optional[str] = None, config=None) -> logging.Logger:
     """Setup logger with console, file, and optional Splunk/syslog output"""
@@ -179,24 +459,14 @@ def setup_logger(name: str, level: Optional[str] = None, config=None) -> logging
     
     # Console handler (always enabled)
     console_handler = logging.StreamHandler()
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
+    console_handler.setFormatter(_CONSOLE_FMT)
     logger.addHandler(console_handler)
     
     # File handler for local logs
     try:
-        os.makedirs('/app/logs', exist_ok=True)
-        file_handler = logging.handlers.RotatingFileHandler(
-            '/app/logs/documentation-generator.log',
-            maxBytes=10*1024*1024,  # 10MB
-            backupCount=5
-        )
-        file_handler.setFormatter(JSONFormatter())
-        logger.addHandler(file_handler)
+        logger.addHandler(_get_file_handler())
     except Exception as e:
-        logger.warning(f"Could not setup file logging: {e}")
+        logger.warning("Could not setup file logging: %s", e)
     
     # Grafana Loki handler
     if config and config.loki_enabled:
@@ -211,35 +481,22 @@ def setup_logger(name: str, level: Optional[str] = None, config=None) -> logging
             logger.addHandler(loki_handler)
             logger.info("Grafana Loki logging enabled")
         except Exception as e:
-            logger.warning(f"Could not setup Loki logging: {e}")
+            logger.warning("Could not setup Loki logging: %s", e)
     
     # Syslog handler (alternative to Splunk)
     if config and config.syslog_enabled:
         try:
-            # Map facility name to constant
-            facility_map = {
-                'local0': logging.handlers.SysLogHandler.LOG_LOCAL0,
-                'local1': logging.handlers.SysLogHandler.LOG_LOCAL1,
-                'local2': logging.handlers.SysLogHandler.LOG_LOCAL2,
-                'local3': logging.handlers.SysLogHandler.LOG_LOCAL3,
-                'local4': logging.handlers.SysLogHandler.LOG_LOCAL4,
-                'local5': logging.handlers.SysLogHandler.LOG_LOCAL5,
-                'local6': logging.handlers.SysLogHandler.LOG_LOCAL6,
-                'local7': logging.handlers.SysLogHandler.LOG_LOCAL7,
-                'user': logging.handlers.SysLogHandler.LOG_USER,
-                'daemon': logging.handlers.SysLogHandler.LOG_DAEMON,
-            }
-            
-            facility = facility_map.get(config.syslog_facility, logging.handlers.SysLogHandler.LOG_LOCAL0)
+            facility = _FACILITY_MAP.get(config.syslog_facility, logging.handlers.SysLogHandler.LOG_LOCAL0)
             
-            syslog_handler = logging.handlers.SysLogHandler(
+            syslog_handler = BatchingSysLogHandler(
                 address=(config.syslog_host, config.syslog_port),
-                facility=facility
+                facility=facility,
+                socktype=socket.SOCK_STREAM if config.syslog_protocol == 'tcp' else socket.SOCK_DGRAM
             )
-            syslog_handler.setFormatter(JSONFormatter())
+            syslog_handler.setFormatter(_JSON_FMT)
             logger.addHandler(syslog_handler)
             logger.info("Syslog logging enabled")
         except Exception as e:
-            logger.warning(f"Could not setup syslog logging: {e}")
+            logger.warning("Could not setup syslog logging: %s", e)
     
     return logger
\ No newline at end of file
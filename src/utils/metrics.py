@@ -1,18 +1,27 @@
 """Prometheus metrics for Documentation Generator"""
 
+import threading
 import time
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from prometheus_client import Counter, Histogram, Gauge, Info, start_http_server
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+def _labeled(cache: Dict[Tuple[str, ...], Any], metric, key: Tuple[str, ...]):
+    """Child of a labeled metric, resolved once per label combination (given in label order)"""
+    child = cache.get(key)
+    if child is None:
+        child = cache[key] = metric.labels(*key)
+    return child
+
 class MetricsCollector:
     """Prometheus metrics collector for Documentation Generator"""
     
     def __init__(self, config=None):
         self.config = config
         self.metrics_enabled = config and config.prometheus_enabled
+        self._server_started = False
         
         if not self.metrics_enabled:
             return
@@ -44,6 +53,12 @@ class MetricsCollector:
             ['ai_provider', 'model', 'status']
         )
         
+        # Labeled children of the metrics above, keyed by label values
+        self._documents_generated_children: Dict[Tuple[str, ...], Any] = {}
+        self._generation_duration_children: Dict[Tuple[str, ...], Any] = {}
+        self._tokens_used_children: Dict[Tuple[str, ...], Any] = {}
+        self._ai_requests_children: Dict[Tuple[str, ...], Any] = {}
+        
         # System metrics
         self.active_generations = Gauge(
             'active_document_generations',
@@ -68,15 +83,19 @@ class MetricsCollector:
             'default_ai_provider': config.default_ai_provider if config else 'unknown',
             'default_model': config.default_model if config else 'unknown'
         })
+    
+    def start(self):
+        """Start the metrics HTTP server, if metrics are enabled and it isn't running yet"""
+        if not self.metrics_enabled or self._server_started:
+            return
         
-        # Start metrics server if enabled
-        if self.metrics_enabled:
-            try:
-                start_http_server(config.prometheus_port)
-                logger.info(f"Prometheus metrics server started on port {config.prometheus_port}")
-            except Exception as e:
-                logger.warning(f"Could not start Prometheus metrics server: {e}")
-                self.metrics_enabled = False
+        try:
+            start_http_server(self.config.prometheus_port)
+            self._server_started = True
+            logger.info("Prometheus metrics server started on port %d", self.config.prometheus_port)
+        except Exception as e:
+            logger.warning("Could not start Prometheus metrics server: %s", e)
+            self.metrics_enabled = False
     
     def record_document_generation_start(self):
         """Record the start of document generation"""
@@ -99,24 +118,16 @@ class MetricsCollector:
         status = 'success' if success else 'error'
         
         # Record metrics
-        self.documents_generated_total.labels(
-            doc_type=doc_type,
-            ai_provider=ai_provider,
-            model=model,
-            status=status
+        _labeled(
+            self._documents_generated_children, self.documents_generated_total, (doc_type, ai_provider, model, status)
         ).inc()
         
-        self.document_generation_duration.labels(
-            doc_type=doc_type,
-            ai_provider=ai_provider,
-            model=model
+        _labeled(
+            self._generation_duration_children, self.document_generation_duration, (doc_type, ai_provider, model)
         ).observe(duration)
         
         if tokens_used:
-            self.ai_tokens_used.labels(
-                ai_provider=ai_provider,
-                model=model
-            ).observe(tokens_used)
+            _labeled(self._tokens_used_children, self.ai_tokens_used, (ai_provider, model)).observe(tokens_used)
         
         self.active_generations.dec()
     
@@ -124,25 +135,27 @@ class MetricsCollector:
         """Record AI API request"""
         if self.metrics_enabled:
             status = 'success' if success else 'error'
-            self.ai_requests_total.labels(
-                ai_provider=ai_provider,
-                model=model,
-                status=status
-            ).inc()
+            _labeled(self._ai_requests_children, self.ai_requests_total, (ai_provider, model, status)).inc()
     
     def update_template_count(self, count: int):
         """Update the number of available template types"""
         if self.metrics_enabled:
             self.template_types_available.set(count)
 
-# Global metrics instance
+# Global metrics instance, created (and its server started) by the first caller
 _metrics_instance = None
+_metrics_lock = threading.Lock()
 
 def get_metrics(config=None) -> MetricsCollector:
     """Get or create global metrics instance"""
     global _metrics_instance
+    # Double-checked so calls after the first are a plain read
     if _metrics_instance is None:
-        _metrics_instance = MetricsCollector(config)
+        with _metrics_lock:
+            if _metrics_instance is None:
+                metrics = MetricsCollector(config)
+                metrics.start()
+                _metrics_instance = metrics
     return _metrics_instance
 
 class DocumentGenerationTimer:
@@ -0,0 +1,58 @@
+"""Shared test setup, run once per pytest session before any test module is imported"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+# Ensure src is on path so we can import the server and generator modules
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, ROOT)
+
+# Make tests use writable fallback dirs instead of /app. This has to happen at import
+# time rather than in a fixture: the test modules import the app while being collected,
+# and the config is read once and cached
+_tmp = tempfile.mkdtemp(prefix="docgen_test_")
+os.environ['FALLBACK_OUTPUT_DIR'] = os.path.join(_tmp, 'output')
+os.environ['FALLBACK_TEMPLATES_DIR'] = os.path.join(_tmp, 'templates')
+
+# Provide dummy openai and anthropic modules so importing the ai_client won't fail during tests
+sys.modules.setdefault('openai', types.ModuleType('openai'))
+sys.modules.setdefault('anthropic', types.ModuleType('anthropic'))
+sys.modules.setdefault('prometheus_client', types.ModuleType('prometheus_client'))
+
+# Populate the fake prometheus_client with the names used by utils.metrics
+fake_prom = sys.modules['prometheus_client']
+class _NoopMetric:
+    def __init__(self, *args, **kwargs):
+        pass
+    def labels(self, *args, **kwargs):
+        return self
+    def inc(self, *args, **kwargs):
+        pass
+    def observe(self, *args, **kwargs):
+        pass
+    def set(self, *args, **kwargs):
+        pass
+    def dec(self, *args, **kwargs):
+        pass
+
+def _start_http_server(port):
+    return None
+
+setattr(fake_prom, 'Counter', _NoopMetric)
+setattr(fake_prom, 'Histogram', _NoopMetric)
+setattr(fake_prom, 'Gauge', _NoopMetric)
+setattr(fake_prom, 'Info', _NoopMetric)
+setattr(fake_prom, 'start_http_server', _start_http_server)
+
+
+@pytest.fixture(scope='session')
+def loop():
+    """One event loop shared by every test, closed when the session ends"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
@@ -0,0 +1,284 @@
+import asyncio
+import dataclasses
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from generators.ai_client import MAX_RETRY_AFTER, AIClient, _chat_completions_result, _retry_delay
+from generators.semantic_cache import SemanticCache
+from utils.config import get_config
+
+
+def make_client(call, **overrides):
+    """AIClient whose 'openai' provider is served by a fake request starter"""
+    config = dataclasses.replace(get_config(), openai_rpm=0, semantic_cache_enabled=False, **overrides)
+    client = AIClient(config)
+    client._adapters['openai'] = (lambda: None, call, _chat_completions_result)
+    return client
+
+
+def chat_response(text):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=None
+    )
+
+
+def chat_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+def test_streams_hold_the_provider_concurrency_slot_until_read(loop):
+    active = 0
+    peak = 0
+
+    async def fake_stream():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            for word in ("a", "b", "c"):
+                await asyncio.sleep(0.01)
+                yield chat_chunk(word)
+        finally:
+            active -= 1
+
+    async def call(client, prompt, model, max_tokens, temperature, cache_prefix=None, **extra):
+        return fake_stream()
+
+    client = make_client(call, openai_concurrency=2)
+
+    async def consume(i):
+        return "".join([chunk async for chunk in client.stream_text(f"prompt {i}", provider='openai', temperature=0.5)])
+
+    async def run():
+        return await asyncio.gather(*(consume(i) for i in range(8)))
+
+    results = loop.run_until_complete(run())
+
+    assert results == ["abc"] * 8
+    assert peak == 2
+
+
+def counting_call(gate=None, error=None):
+    """Fake request starter that records prompts and optionally waits on a gate or fails"""
+    prompts = []
+
+    async def call(client, prompt, model, max_tokens, temperature, cache_prefix=None, **extra):
+        prompts.append(prompt)
+        if gate is not None:
+            await gate.wait()
+        if error is not None:
+            raise error
+        return chat_response(f"response to {prompt}")
+
+    return call, prompts
+
+
+def test_cache_evicts_least_recently_used_response(loop):
+    call, prompts = counting_call()
+    client = make_client(call, ai_cache_size=2)
+
+    async def generate(prompt):
+        return await client.generate_text(prompt, provider='openai', temperature=0)
+
+    async def run():
+        await generate("one")
+        await generate("two")
+        await generate("one")    # hit, and now the most recently used
+        await generate("three")  # evicts "two"
+        await generate("one")
+        await generate("two")
+
+    loop.run_until_complete(run())
+
+    assert prompts == ["one", "two", "three", "two"]
+
+
+def test_identical_concurrent_requests_share_one_provider_call(loop):
+    async def run():
+        gate = asyncio.Event()
+        call, prompts = counting_call(gate)
+        client = make_client(call)
+
+        tasks = [
+            asyncio.ensure_future(client.generate_text("same", provider='openai', temperature=0.7))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        return prompts, await asyncio.gather(*tasks)
+
+    prompts, results = loop.run_until_complete(run())
+
+    assert prompts == ["same"]
+    assert results == ["response to same"] * 5
+
+
+def test_in_flight_error_reaches_every_waiter(loop):
+    async def run():
+        gate = asyncio.Event()
+        call, prompts = counting_call(gate, error=ValueError("boom"))
+        client = make_client(call)
+
+        tasks = [
+            asyncio.ensure_future(client.generate_text("same", provider='openai', temperature=0))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        return prompts, await asyncio.gather(*tasks, return_exceptions=True)
+
+    prompts, results = loop.run_until_complete(run())
+
+    assert prompts == ["same"]
+    assert all(isinstance(result, ValueError) and str(result) == "boom" for result in results)
+
+
+def test_waiter_makes_its_own_request_when_the_owner_is_cancelled(loop):
+    async def run():
+        gate = asyncio.Event()
+        call, prompts = counting_call(gate)
+        client = make_client(call)
+
+        owner = asyncio.ensure_future(client.generate_text("same", provider='openai', temperature=0))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(client.generate_text("same", provider='openai', temperature=0))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        return prompts, owner, await waiter
+
+    prompts, owner, result = loop.run_until_complete(run())
+
+    assert owner.cancelled()
+    assert prompts == ["same", "same"]
+    assert result == "response to same"
+
+
+def test_streaming_waiter_gets_the_shared_response_in_one_piece(loop):
+    async def run():
+        gate = asyncio.Event()
+
+        async def fake_stream():
+            await gate.wait()
+            for word in ("Hello", " ", "world"):
+                yield chat_chunk(word)
+
+        calls = []
+
+        async def call(client, prompt, model, max_tokens, temperature, cache_prefix=None, **extra):
+            calls.append(prompt)
+            return fake_stream()
+
+        client = make_client(call)
+
+        async def consume():
+            return [chunk async for chunk in client.stream_text("same", provider='openai', temperature=0)]
+
+        owner = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        gate.set()
+        return calls, await owner, await waiter
+
+    calls, owner_chunks, waiter_chunks = loop.run_until_complete(run())
+
+    assert calls == ["same"]
+    assert "".join(owner_chunks) == "Hello world"
+    assert waiter_chunks == ["Hello world"]
+
+
+def test_semantic_cache_only_reuses_responses_within_the_same_scope(loop):
+    pytest.importorskip('numpy')
+    call, prompts = counting_call()
+    client = make_client(call)
+    client.config = dataclasses.replace(client.config, semantic_cache_enabled=True)
+    client._semantic_cache = SemanticCache(16, threshold=0.9)
+
+    async def fake_embed(text):
+        # Texts starting with the same word count as near-identical
+        return [1.0, 0.0] if text.startswith("meeting") else [0.0, 1.0]
+
+    client.embed = fake_embed
+
+    async def generate(prompt, scope, text):
+        return await client.generate_text(prompt, provider='openai', temperature=0.2, semantic_key=(scope, text))
+
+    async def run():
+        return [
+            await generate("sop: meeting A", "sop", "meeting A"),
+            await generate("sop: meeting B", "sop", "meeting B"),
+            await generate("runbook: meeting B", "runbook", "meeting B"),
+        ]
+
+    results = loop.run_until_complete(run())
+
+    assert prompts == ["sop: meeting A", "runbook: meeting B"]
+    assert results == ["response to sop: meeting A", "response to sop: meeting A", "response to runbook: meeting B"]
+
+
+def test_race_without_configured_providers_uses_the_default_provider(loop):
+    call, prompts = counting_call()
+    client = make_client(call, ai_race_enabled=True, ai_race_providers=(), default_ai_provider='openai')
+
+    result = loop.run_until_complete(client.generate_text_race("prompt"))
+
+    assert prompts == ["prompt"]
+    assert result == ('openai', 'gpt-4o-mini', "response to prompt")
+
+
+def test_race_reports_the_winning_provider_with_its_model_and_usage(loop):
+    requested = []
+
+    async def failing_call(client, prompt, model, max_tokens, temperature, cache_prefix=None, **extra):
+        requested.append(('openai', model))
+        raise ValueError("openai is down")
+
+    async def anthropic_call(client, prompt, model, max_tokens, temperature, cache_prefix=None, **extra):
+        requested.append(('anthropic', model))
+        await asyncio.sleep(0.01)
+        response = chat_response("from anthropic")
+        response.usage = SimpleNamespace(prompt_tokens=5, completion_tokens=7)
+        return response
+
+    client = make_client(
+        failing_call, ai_race_enabled=True, ai_race_providers=('openai', 'anthropic'), default_model='gpt-4o-mini'
+    )
+    client._adapters['anthropic'] = (lambda: None, anthropic_call, _chat_completions_result)
+    usage = {}
+
+    result = loop.run_until_complete(client.generate_text_race("prompt", temperature=0.5, usage=usage))
+
+    assert sorted(requested) == [('anthropic', 'claude-3-haiku-20240307'), ('openai', 'gpt-4o-mini')]
+    assert result == ('anthropic', 'claude-3-haiku-20240307', "from anthropic")
+    assert usage == {'prompt_tokens': 5, 'completion_tokens': 7}
+
+
+def test_retry_delay_covers_dropped_connections_and_caps_retry_after(monkeypatch):
+    class APIConnectionError(Exception):
+        pass
+
+    class APITimeoutError(APIConnectionError):
+        pass
+
+    def status_error(status_code, retry_after=None):
+        headers = {'retry-after': retry_after} if retry_after is not None else {}
+        error = Exception(status_code)
+        error.status_code = status_code
+        error.response = SimpleNamespace(headers=headers)
+        return error
+
+    monkeypatch.setattr(sys.modules['openai'], 'APIConnectionError', APIConnectionError, raising=False)
+
+    assert _retry_delay(APITimeoutError(), 0) is not None
+    assert _retry_delay(status_error(408), 0) is not None
+    assert _retry_delay(status_error(409), 0) is not None
+    assert _retry_delay(status_error(400), 0) is None
+    assert _retry_delay(ValueError("bad prompt"), 0) is None
+    assert _retry_delay(status_error(429, "3600"), 0) == MAX_RETRY_AFTER
+    assert _retry_delay(status_error(503, "2"), 0) == 2.0
@@ -0,0 +1,242 @@
+import asyncio
+import dataclasses
+import json
+
+import pytest
+
+from generators.document_generator import DocumentGenerator
+from utils.config import get_config
+
+
+def test_zero_temperature_and_max_tokens_are_not_replaced_by_defaults(monkeypatch, loop):
+    generator = DocumentGenerator(get_config())
+
+    captured = {}
+
+    async def fake_stream_text(prompt, provider=None, model=None, max_tokens=None, temperature=None, usage=None, **kwargs):
+        captured['max_tokens'] = max_tokens
+        captured['temperature'] = temperature
+        yield "# Doc"
+
+    monkeypatch.setattr(generator.ai_client, 'stream_text', fake_stream_text)
+
+    async def generate():
+        result = await generator.generate_document(
+            content='def f(): pass',
+            doc_type='api_doc',
+            title='Zero Settings',
+            max_tokens=0,
+            temperature=0.0
+        )
+        await generator.flush_metadata()
+        return result
+
+    result = loop.run_until_complete(generate())
+
+    assert captured == {'max_tokens': 0, 'temperature': 0.0}
+    assert result['metadata']['max_tokens'] == 0
+    assert result['metadata']['temperature'] == 0.0
+
+
+def test_title_cannot_escape_output_dir(monkeypatch, loop):
+    generator = DocumentGenerator(get_config())
+
+    async def fake_stream_text(prompt, provider=None, model=None, max_tokens=None, temperature=None, usage=None, **kwargs):
+        yield "# Doc"
+
+    monkeypatch.setattr(generator.ai_client, 'stream_text', fake_stream_text)
+
+    async def generate():
+        result = await generator.generate_document(
+            content='def f(): pass',
+            doc_type='api_doc',
+            title='../etc/passwd'
+        )
+        await generator.flush_metadata()
+        return result
+
+    result = loop.run_until_complete(generate())
+
+    filepath = (generator.output_dir / result['filename']).resolve()
+    assert '/' not in result['filename']
+    assert filepath.parent == generator.output_dir.resolve()
+    assert filepath.exists()
+
+
+def make_generator(output_dir):
+    return DocumentGenerator(dataclasses.replace(get_config(), output_dir=str(output_dir)))
+
+
+def metadata_entry(doc_id, created_at):
+    return {
+        'id': doc_id,
+        'title': doc_id,
+        'doc_type': 'api_doc',
+        'filename': f'api_doc_{doc_id}.md',
+        'created_at': created_at
+    }
+
+
+def read_log(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_metadata_round_trips_through_the_log(monkeypatch, loop, tmp_path):
+    generator = make_generator(tmp_path)
+
+    async def fake_stream_text(prompt, provider=None, model=None, max_tokens=None, temperature=None, usage=None, **kwargs):
+        yield "# Doc"
+
+    monkeypatch.setattr(generator.ai_client, 'stream_text', fake_stream_text)
+
+    async def generate():
+        results = [
+            await generator.generate_document(content='x', doc_type='api_doc', title=title)
+            for title in ('First', 'Second')
+        ]
+        await generator.flush_metadata()
+        return results
+
+    results = loop.run_until_complete(generate())
+
+    reloaded = make_generator(tmp_path)
+    assert reloaded.metadata == generator.metadata
+    assert list(reloaded.metadata) == [result['id'] for result in results]
+    assert len(read_log(reloaded.metadata_file)) == 2
+    document = reloaded.get_generated_document(results[1]['filename'])
+    assert document['metadata']['title'] == 'Second'
+    assert document['content'] == '# Doc'
+
+
+def test_torn_last_metadata_line_is_skipped_and_compacted(tmp_path):
+    entries = [metadata_entry('a', '2024-01-01T00:00:00'), metadata_entry('b', '2024-01-02T00:00:00')]
+    log = tmp_path / 'documents_metadata.jsonl'
+    log.write_text(''.join(json.dumps(entry) + '\n' for entry in entries) + '{"id": "c", "tit')
+
+    generator = make_generator(tmp_path)
+
+    assert list(generator.metadata) == ['a', 'b']
+    assert read_log(log) == entries
+    assert not log.with_suffix('.jsonl.tmp').exists()
+
+
+def test_later_metadata_records_replace_earlier_ones(tmp_path):
+    first = metadata_entry('a', '2024-01-01T00:00:00')
+    updated = dict(first, title='Updated')
+    log = tmp_path / 'documents_metadata.jsonl'
+    log.write_text(json.dumps(first) + '\n' + json.dumps(updated) + '\n')
+
+    generator = make_generator(tmp_path)
+
+    assert generator.metadata == {'a': updated}
+    assert read_log(log) == [updated]
+
+
+def test_legacy_metadata_json_is_migrated_in_creation_order(tmp_path):
+    legacy = {
+        'b': metadata_entry('b', '2024-01-02T00:00:00'),
+        'a': metadata_entry('a', '2024-01-01T00:00:00'),
+    }
+    (tmp_path / 'documents_metadata.json').write_text(json.dumps(legacy))
+
+    generator = make_generator(tmp_path)
+
+    assert list(generator.metadata) == ['a', 'b']
+    assert read_log(tmp_path / 'documents_metadata.jsonl') == [legacy['a'], legacy['b']]
+    assert generator.get_generated_document_path('api_doc_a.md') is None
+
+
+def test_documents_race_providers_when_enabled_and_none_is_named(monkeypatch, loop, tmp_path):
+    generator = DocumentGenerator(dataclasses.replace(get_config(), output_dir=str(tmp_path), ai_race_enabled=True))
+
+    async def fake_race(prompt, providers=None, model=None, max_tokens=None, temperature=None, usage=None):
+        usage['completion_tokens'] = 3
+        return 'openrouter', 'openai/gpt-4o-mini', "# Fastest"
+
+    async def fail_stream_text(*args, **kwargs):
+        raise AssertionError("racing should not stream from a single provider")
+        yield
+
+    monkeypatch.setattr(generator.ai_client, 'generate_text_race', fake_race)
+    monkeypatch.setattr(generator.ai_client, 'stream_text', fail_stream_text)
+
+    async def generate():
+        result = await generator.generate_document(content='x', doc_type='api_doc', title='Raced')
+        await generator.flush_metadata()
+        return result
+
+    result = loop.run_until_complete(generate())
+
+    assert result['markdown'] == '# Fastest'
+    assert (tmp_path / result['filename']).read_text() == '# Fastest'
+    assert result['metadata']['ai_provider'] == 'openrouter'
+    assert result['metadata']['model'] == 'openai/gpt-4o-mini'
+
+
+def test_live_batch_is_bounded_and_honours_per_job_settings(monkeypatch, loop, tmp_path):
+    generator = DocumentGenerator(dataclasses.replace(
+        get_config(), output_dir=str(tmp_path), max_concurrent_llm_calls=2
+    ))
+
+    active = 0
+    peak = 0
+    providers = []
+
+    async def fake_stream_text(prompt, provider=None, model=None, max_tokens=None, temperature=None, usage=None, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        providers.append(provider)
+        await asyncio.sleep(0.01)
+        active -= 1
+        yield "# Doc"
+
+    monkeypatch.setattr(generator.ai_client, 'stream_text', fake_stream_text)
+
+    jobs = [{'content': 'x', 'doc_type': 'api_doc', 'title': f'Doc {i}'} for i in range(5)]
+    jobs.append({'content': 'x', 'doc_type': 'unknown', 'title': 'Broken'})
+    jobs[0]['ai_provider'] = 'anthropic'
+
+    async def generate():
+        results = await generator.generate_documents_batch(jobs, use_batch_api=False, ai_provider='openai')
+        await generator.flush_metadata()
+        return results
+
+    results = loop.run_until_complete(generate())
+
+    assert peak == 2
+    assert sorted(providers) == ['anthropic'] + ['openai'] * 4
+    assert [result['markdown'] for result in results[:5]] == ['# Doc'] * 5
+    assert isinstance(results[5], ValueError)
+
+
+def test_batch_api_jobs_record_generation_metrics(monkeypatch, loop, tmp_path):
+    generator = DocumentGenerator(dataclasses.replace(get_config(), output_dir=str(tmp_path)))
+
+    async def fake_generate_batch(prompts, provider=None, model=None, max_tokens=None, temperature=None):
+        first = next(iter(prompts))
+        return {first: "# Batched"}
+
+    completed = []
+
+    def record_complete(doc_type, ai_provider, model, duration, tokens_used=None, success=True):
+        completed.append((doc_type, ai_provider, success))
+
+    monkeypatch.setattr(generator.ai_client, 'generate_batch', fake_generate_batch)
+    monkeypatch.setattr(generator.metrics, 'record_document_generation_complete', record_complete)
+
+    jobs = [
+        {'content': 'x', 'doc_type': 'api_doc', 'title': 'Kept'},
+        {'content': 'x', 'doc_type': 'runbook', 'title': 'Dropped'},
+    ]
+
+    async def generate():
+        results = await generator.generate_documents_batch(jobs, ai_provider='openai')
+        await generator.flush_metadata()
+        return results
+
+    results = loop.run_until_complete(generate())
+
+    assert results[0]['markdown'] == '# Batched'
+    assert isinstance(results[1], RuntimeError)
+    assert completed == [('api_doc', 'openai', True), ('runbook', 'openai', False)]
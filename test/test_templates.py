@@ -0,0 +1,56 @@
+import pytest
+
+from generators.templates import DocumentTemplates, _BUILTINS, _renderer
+
+# Values with braces, quotes and backslashes, which must come through untouched
+VALUES = {
+    'title': 'Title with {braces} and "quotes"',
+    'content': "def f():\n    return '\\n' + \"{x}\"\n",
+    'context': 'C:\\path\\{name} """triple""" \'\'\'single\'\'\'',
+}
+
+CUSTOM_TEMPLATES = {
+    'escaped_braces': 'Literal {{title}} and {{ }} around {title}',
+    'quotes': 'He said "{title}" and \'{content}\' then """{context}""" and \'\'\'{title}\'\'\'',
+    'backslashes': 'Path C:\\new\\{title}\\table \\N{{BULLET}} \\x41 \\\\ {content}\n{context}\\',
+    'no_fields': 'Nothing to fill in',
+    'repeated': '{content}{content}{title}{context}{title}',
+    'format_spec': 'Padded {title:>60} and {content!r}',
+}
+
+
+@pytest.mark.parametrize('doc_type', sorted(_BUILTINS))
+def test_builtin_templates_render_like_str_format(tmp_path, doc_type):
+    templates = DocumentTemplates(tmp_path)
+    template = templates.get_template(doc_type)
+
+    assert _renderer(template) is not None
+    assert templates.render(doc_type, **VALUES) == template.format(**VALUES)
+
+
+@pytest.mark.parametrize('doc_type', sorted(CUSTOM_TEMPLATES))
+def test_custom_templates_render_like_str_format(tmp_path, doc_type):
+    templates = DocumentTemplates(tmp_path)
+    template = CUSTOM_TEMPLATES[doc_type]
+    templates.add_custom_type(doc_type, 'Custom', template)
+
+    # Only the format spec and conversion need the str.format fallback
+    assert (_renderer(template) is None) == (doc_type == 'format_spec')
+    assert templates.render(doc_type, **VALUES) == template.format(**VALUES)
+
+
+def test_unknown_field_falls_back_to_str_format(tmp_path):
+    templates = DocumentTemplates(tmp_path)
+    templates.add_custom_type('missing_field', 'Custom', 'Needs {title} and {author}')
+
+    assert _renderer('Needs {title} and {author}') is None
+    with pytest.raises(KeyError, match='author'):
+        templates.render('missing_field', **VALUES)
+
+
+def test_saving_unchanged_templates_after_load_skips_the_write(tmp_path, monkeypatch):
+    DocumentTemplates(tmp_path).add_custom_type('runbook', 'Custom', 'Steps for {title}')
+
+    templates = DocumentTemplates(tmp_path)
+    monkeypatch.setattr('generators.templates.os.replace', lambda *args: pytest.fail('file rewritten'))
+    assert templates.add_custom_type('runbook', 'Custom', 'Steps for {title}')